@@ -0,0 +1,178 @@
+import json
+import os
+import re
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+
+# Every account keeps its own ledger in its own database file; the registry
+# maps account names to those files. Without a registry there is one
+# account backed by the original database file.
+REGISTRY = 'accounts.json'
+ACCOUNTS_DIR = 'accounts'
+DEFAULT_ACCOUNT = 'Main'
+DEFAULT_DB = 'TransactionDatabase.db'
+
+# Account files already migrated by this process, and the shared thread
+# pools for reading them, keyed by size. Pool threads live on, so their
+# connections from database.thread_database are reused between reads.
+_migrated = set()
+_migrate_lock = threading.Lock()
+_pools = {}
+
+
+def _registry_dir(registry):
+    return os.path.dirname(os.path.abspath(registry))
+
+
+def load_accounts(registry=REGISTRY):
+    """Return {account name: database path} in the order they were added."""
+    if not os.path.exists(registry):
+        return {DEFAULT_ACCOUNT: DEFAULT_DB}
+    with open(registry) as f:
+        accounts = json.load(f)['accounts']
+    # Paths in the registry are relative to the registry file
+    base = _registry_dir(registry)
+    return {name: os.path.join(base, path) for name, path in accounts.items()}
+
+
+def _save_accounts(accounts, registry):
+    base = _registry_dir(registry)
+    relative = {name: os.path.relpath(os.path.abspath(path), base) for name, path in accounts.items()}
+    temp = registry + '.tmp'
+    with open(temp, 'w') as f:
+        json.dump({'accounts': relative}, f, indent=2)
+    os.replace(temp, registry)
+
+
+def add_account(name, registry=REGISTRY):
+    """Register a new account with its own, freshly migrated database file."""
+    name = name.strip()
+    if not name:
+        raise ValueError("Account name can't be empty.")
+    accounts = load_accounts(registry)
+    if name in accounts:
+        raise ValueError(f"Account {name!r} already exists.")
+
+    directory = os.path.join(_registry_dir(registry), ACCOUNTS_DIR)
+    os.makedirs(directory, exist_ok=True)
+    slug = re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-') or 'account'
+    path = os.path.join(directory, f"{slug}.db")
+    suffix = 1
+    while os.path.exists(path):
+        suffix += 1
+        path = os.path.join(directory, f"{slug}-{suffix}.db")
+
+    db = database.Database(path)
+    database.migrate(db)
+    db.close()
+    with _migrate_lock:
+        _migrated.add(os.path.abspath(path))
+    accounts[name] = path
+    _save_accounts(accounts, registry)
+    return path
+
+
+def remove_account(name, registry=REGISTRY):
+    """Unregister an account. Its database file is left on disk."""
+    accounts = load_accounts(registry)
+    if name not in accounts:
+        raise ValueError(f"No account named {name!r}.")
+    if len(accounts) == 1:
+        raise ValueError("Can't remove the only account.")
+    del accounts[name]
+    _save_accounts(accounts, registry)
+
+
+def account_path(name, registry=REGISTRY):
+    accounts = load_accounts(registry)
+    if name not in accounts:
+        raise ValueError(f"No account named {name!r}.")
+    return accounts[name]
+
+
+def ensure_migrated(path):
+    """Bring an account's schema up to date, once per process."""
+    key = os.path.abspath(path)
+    with _migrate_lock:
+        if key in _migrated:
+            return
+        # A no-op unless the account was last opened by an older version
+        database.migrate(database.thread_database(path))
+        _migrated.add(key)
+
+
+def _read_account(path, func, args):
+    ensure_migrated(path)
+    return func(database.thread_database(path), *args)
+
+
+def _pool(workers):
+    with _migrate_lock:
+        if workers not in _pools:
+            _pools[workers] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='accounts')
+        return _pools[workers]
+
+
+def map_accounts(paths, func, *args, workers=None):
+    """Run func(db, *args) against every account database in parallel.
+
+    Each account is read on a thread of a shared pool, through that
+    thread's own connection, which later reads reuse. sqlite3 releases the
+    GIL while a query runs, so large accounts are scanned at the same time
+    instead of one after another. Results come back in the order of paths.
+    """
+    paths = list(paths)
+    if len(paths) <= 1 or workers == 1:
+        return [_read_account(path, func, args) for path in paths]
+    pool = _pool(workers or (os.cpu_count() or 1) + 4)
+    return list(pool.map(lambda path: _read_account(path, func, args), paths))
+
+
+def sum_by_key(results):
+    """Merge lists of (key, amount) rows by summing amounts, sorted by key."""
+    totals = defaultdict(int)
+    for rows in results:
+        for key, amount in rows:
+            totals[key] += amount
+    return sorted(totals.items())
+
+
+# Combined readers. They take the account paths in place of a db and return
+# the same shapes as the database readers they are named after.
+def get_monthly_balance(paths, workers=None):
+    return sum_by_key(map_accounts(paths, database.get_monthly_balance, workers=workers))
+
+
+def get_monthly_income(paths, workers=None):
+    return sum_by_key(map_accounts(paths, database.get_monthly_income, workers=workers))
+
+
+def get_monthly_spending(paths, month, workers=None):
+    return sum_by_key(map_accounts(paths, database.get_monthly_spending, month, workers=workers))
+
+
+def get_spending_months(paths, workers=None):
+    return sorted(set().union(*map_accounts(paths, database.get_spending_months, workers=workers)))
+
+
+def get_spending_cube(paths, start_month=None, end_month=None, workers=None):
+    results = map_accounts(paths, database.get_spending_cube, start_month, end_month, workers=workers)
+    cells = sum_by_key([((month, spend_type), amount) for month, spend_type, amount in rows] for rows in results)
+    return [(month, spend_type, amount) for (month, spend_type), amount in cells]
+
+
+def get_running_balance(paths, workers=None):
+    return sum(map_accounts(paths, database.get_running_balance, workers=workers))
+
+
+def _totals(db):
+    return db.get_total_income(), db.get_total_expenses()
+
+
+def get_account_totals(accounts, workers=None):
+    """(name, income, spending) for every account, in cents, read in parallel."""
+    totals = map_accounts(accounts.values(), _totals, workers=workers)
+    return [(name, income, spending) for name, (income, spending) in zip(accounts, totals)]
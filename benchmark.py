@@ -0,0 +1,230 @@
+"""Benchmark harness for the hot paths of the finance planner.
+
+Builds a synthetic ledger of the requested size, times the database, graph
+and loan calculations, and writes a JSON report. Pass --baseline to compare
+against an earlier report; the exit status is 1 when anything regressed.
+
+    python benchmark.py --rows 100000 --output bench.json
+    python benchmark.py --rows 100000 --baseline bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+import database
+import interest
+
+CATEGORIES = [
+    'rent', 'groceries', 'utilities', 'entertainment', 'dining', 'transport',
+    'insurance', 'healthcare', 'education', 'clothing', 'travel', 'gifts',
+    'subscriptions', 'phone', 'internet', 'savings', 'pets', 'household',
+]
+
+
+def month_labels(months, start_year=2000):
+    return [f"{start_year + i // 12:04d}-{i % 12 + 1:02d}" for i in range(months)]
+
+
+def generate_ledger(db, rows, months=120, categories=CATEGORIES, seed=0, income_share=0.2, chunk_size=50000):
+    """Insert `rows` synthetic INCOME/SPEND rows spread over `months` months.
+
+    The same seed always produces the same ledger. Rows are inserted in
+    chunks, one transaction per chunk. Returns the list of month labels used.
+    """
+    rng = random.Random(seed)
+    labels = month_labels(months)
+    remaining = rows
+    while remaining > 0:
+        count = min(chunk_size, remaining)
+        income_rows = []
+        spend_rows = []
+        for _ in range(count):
+            month = labels[rng.randrange(months)]
+            date_key = int(month.replace('-', '')) * 100 + rng.randint(1, 28)
+            if rng.random() < income_share:
+                income_rows.append((month, date_key, rng.randint(50000, 500000)))
+            else:
+                spend_rows.append((month, date_key, rng.choice(categories), rng.randint(500, 150000)))
+        with db.transaction():
+            db.insert_data(database.INSERT_INCOME_SQL, income_rows)
+            db.insert_data(database.INSERT_SPEND_SQL, spend_rows)
+        database.mark_changed(db, 'INCOME', 'SPEND')
+        remaining -= count
+    return labels
+
+
+def time_call(func, repeat):
+    """Run func `repeat` times and summarize the wall-clock timings in ms."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'repeat': repeat,
+        'min_ms': min(timings),
+        'median_ms': statistics.median(timings),
+        'mean_ms': statistics.fmean(timings),
+        'max_ms': max(timings),
+    }
+
+
+def run_database_benchmarks(db, labels, repeat, seed):
+    rng = random.Random(seed + 1)
+    month = labels[len(labels) // 2]
+    results = {
+        'add_income': time_call(lambda: database.add_income(db, rng.choice(labels), 100), repeat),
+        'add_spend': time_call(lambda: database.add_spend(db, rng.choice(labels), 'groceries', 50), repeat),
+        'update_monthly_balance': time_call(lambda: database.update_monthly_balance(db, month), repeat),
+        'get_total_income': time_call(db.get_total_income, repeat),
+    }
+
+    # The aggregate readers are cached; time the query itself and a cache hit
+    readers = {
+        'get_monthly_balance': (database.get_monthly_balance, ()),
+        'get_monthly_spending': (database.get_monthly_spending, (month,)),
+        'get_monthly_income': (database.get_monthly_income, ()),
+        'get_running_balance': (database.get_running_balance, ()),
+    }
+    for name, (reader, args) in readers.items():
+        results[name] = time_call(lambda: reader.uncached(db, *args), repeat)
+        results[f'{name}[cached]'] = time_call(lambda: reader(db, *args), repeat)
+    return results
+
+
+def run_interest_benchmarks(repeat):
+    # A 30-year mortgage and a near-interest-only payment
+    cases = {
+        'mortgage': (300000, 0.065, 1900),
+        'near_interest_only': (300000, 0.065, 1630),
+    }
+    results = {}
+    for name, args in cases.items():
+        results[f'Calculate_compound_interest[{name}]'] = time_call(
+            lambda: interest.Calculate_compound_interest(*args), repeat)
+        results[f'loan_summary[{name}]'] = time_call(lambda: interest.loan_summary(*args), repeat)
+    return results
+
+
+def run_graph_benchmarks(db, repeat):
+    """Time the GraphWidget plot methods on an offscreen Qt platform."""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    import charts
+
+    app = QApplication.instance() or QApplication([])
+    graph = charts.GraphWidget()
+    results = {}
+    for name in ('plot_balance', 'plot_expenses', 'plot_income'):
+        plot = getattr(graph, name)
+        # Alternate with another graph so every call does a full rebuild
+        other = graph.plot_income if name != 'plot_income' else graph.plot_balance
+
+        def full_redraw():
+            other(db)
+            plot(db)
+            app.processEvents()
+        results[f'GraphWidget.{name}'] = time_call(full_redraw, repeat)
+        results[f'GraphWidget.{name}[refresh]'] = time_call(lambda: (plot(db), app.processEvents()), repeat)
+    return results
+
+
+def compare(report, baseline, tolerance=0.25, min_delta_ms=0.05):
+    """Return the benchmarks whose median got slower than the baseline.
+
+    A benchmark regresses when its median is more than `tolerance` (as a
+    fraction) and `min_delta_ms` slower than the baseline median.
+    """
+    regressions = []
+    for name, result in report['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if base is None:
+            continue
+        before, after = base['median_ms'], result['median_ms']
+        if after > before * (1 + tolerance) and after - before > min_delta_ms:
+            regressions.append((name, before, after))
+    return regressions
+
+
+def run(rows, months, seed, repeat, db_path=None, gui=True):
+    """Build the ledger, run every benchmark and return the report dict."""
+    temp_dir = None
+    if db_path is None:
+        temp_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(temp_dir.name, 'benchmark.db')
+    try:
+        db = database.Database(db_path)
+        database.migrate(db)
+
+        start = time.perf_counter()
+        labels = generate_ledger(db, rows, months=months, seed=seed)
+        generate_ms = (time.perf_counter() - start) * 1000
+
+        results = run_database_benchmarks(db, labels, repeat, seed)
+        results.update(run_interest_benchmarks(repeat))
+        if gui:
+            results.update(run_graph_benchmarks(db, max(1, repeat // 10)))
+        db.close()
+    finally:
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+    return {
+        'meta': {
+            'rows': rows,
+            'months': months,
+            'seed': seed,
+            'repeat': repeat,
+            'generate_ms': generate_ms,
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'query_cache': database.query_cache.stats(),
+        },
+        'results': results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the finance planner hot paths.")
+    parser.add_argument('--rows', type=int, default=10000, help="synthetic INCOME/SPEND rows to generate")
+    parser.add_argument('--months', type=int, default=120, help="number of months to spread the rows over")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=50, help="timed runs per benchmark")
+    parser.add_argument('--db', help="database file to build (default: a temporary file)")
+    parser.add_argument('--no-gui', action='store_true', help="skip the GraphWidget benchmarks")
+    parser.add_argument('--output', help="write the JSON report here instead of stdout")
+    parser.add_argument('--baseline', help="JSON report to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed slowdown as a fraction of the baseline median")
+    args = parser.parse_args(argv)
+
+    report = run(args.rows, args.months, args.seed, args.repeat, args.db, gui=not args.no_gui)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: {before:.3f} ms -> {after:.3f} ms", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+from collections import OrderedDict
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+import database
+
+# Pages kept in memory at once; the rest are read again when scrolled back to
+MAX_PAGES = 10
+
+# (header, sort key or None when the column can't be sorted)
+COLUMNS = (
+    ('Date', 'date'),
+    ('Kind', None),
+    ('Type', None),
+    ('Amount', 'amount'),
+)
+
+
+class TransactionTableModel(QAbstractTableModel):
+    """Table model over INCOME and SPEND that loads pages as the view scrolls.
+
+    Qt asks for more rows through canFetchMore/fetchMore when the user nears
+    the bottom; each request reads one database.fetch_page after the last
+    row already loaded. Only the max_pages most recently viewed pages are
+    held in memory. For the others just the page_key of the row before them
+    is kept, so scrolling back seeks straight to them again and memory stays
+    flat however large the ledger is. Sorting and filters go into the SQL
+    and start again from the first page.
+    """
+
+    def __init__(self, db, page_size=database.PAGE_SIZE, max_pages=MAX_PAGES, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.page_size = page_size
+        self.max_pages = max(max_pages, 2)
+        self.table = None
+        self.category = None
+        self.month = None
+        self.sort_key = 'date'
+        self.descending = True
+        self.row_count = 0
+        self.starts = []  # page number -> page_key of the row before it
+        self.pages = OrderedDict()  # page number -> rows, least recently used first
+        self.last_key = None
+        self.exhausted = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLUMNS[section][0]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        page, offset = divmod(index.row(), self.page_size)
+        rows = self._page(page)
+        if offset >= len(rows):
+            return None  # rows deleted since the page was first read
+        kind, _, date_key, spend_type, amount = rows[offset]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return database.from_date_key(date_key).isoformat()
+            if column == 1:
+                return 'Income' if kind == 'income' else 'Spending'
+            if column == 2:
+                return spend_type or ''
+            return database.format_cents(amount)
+        if role == Qt.TextAlignmentRole and column == 3:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.exhausted:
+            return
+        page = self._read(self.last_key)
+        self.exhausted = len(page) < self.page_size
+        if page:
+            self.beginInsertRows(QModelIndex(), self.row_count, self.row_count + len(page) - 1)
+            self.starts.append(self.last_key)
+            self._keep(len(self.starts) - 1, page)
+            self.last_key = database.page_key(page[-1], self.sort_key)
+            self.row_count += len(page)
+            self.endInsertRows()
+
+    def _read(self, after):
+        return database.fetch_page(self.db, self.table, after, self.page_size, self.sort_key, self.descending,
+                                   self.category, self.month)
+
+    def _page(self, number):
+        """Rows of an already fetched page, seeking back to it if evicted."""
+        rows = self.pages.get(number)
+        if rows is None:
+            rows = self._read(self.starts[number])
+            self._keep(number, rows)
+        else:
+            self.pages.move_to_end(number)
+        return rows
+
+    def _keep(self, number, rows):
+        self.pages[number] = rows
+        while len(self.pages) > self.max_pages:
+            self.pages.popitem(last=False)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        sort_key = COLUMNS[column][1]
+        if sort_key is None:
+            return
+        self.sort_key = sort_key
+        self.descending = order == Qt.DescendingOrder
+        self.reload()
+
+    def set_filters(self, table=None, category=None, month=None):
+        """Show only one table, spending category or 'YYYY-MM' month."""
+        self.table = table
+        self.category = category
+        self.month = month
+        self.reload()
+
+    def reload(self):
+        self.beginResetModel()
+        self.row_count = 0
+        self.starts = []
+        self.pages.clear()
+        self.last_key = None
+        self.exhausted = False
+        self.endResetModel()
+        # Views only ask for more once they have rows, so load the first page
+        self.fetchMore()
@@ -0,0 +1,133 @@
+import accounts
+import database
+import forecast
+
+# Categories shown separately in the multi-month spending charts; the rest
+# are summed into 'other'
+TOP_CATEGORIES = 8
+
+
+# Graph data loaders. They only touch the database, so MainWindow runs them
+# on a worker thread and hands the result to the matching
+# charts.GraphWidget.render_*. Nothing here imports matplotlib.
+# The database works in cents; values are converted to dollars here.
+
+
+def load_balance_data(db):
+    # Fetch monthly balance data from the database
+    balance_data = database.get_monthly_balance(db)
+    months = [row[0] for row in balance_data]
+    balances = [database.cents_to_dollars(row[1]) for row in balance_data]
+    return months, balances
+
+
+def load_expenses_data(db, month=None):
+    # Fetch one month's expenses by category, the latest month by default
+    if month is None:
+        months = database.get_spending_months(db)
+        month = months[-1] if months else None
+    expense_data = database.get_monthly_spending(db, month) if month else []
+    categories = [row[0] for row in expense_data]
+    expenses = [database.cents_to_dollars(row[1]) for row in expense_data]
+    return categories, expenses, month
+
+
+def spending_series(cube, top_n=TOP_CATEGORIES):
+    """Turn (month, type, amount) cube rows into one series per category.
+
+    Returns (months, [(category, dollars per month), ...]) with the top_n
+    categories by total and the rest summed into 'other'.
+    """
+    months = sorted({month for month, _, _ in cube})
+    column = {month: i for i, month in enumerate(months)}
+    totals = {}
+    for _, spend_type, amount in cube:
+        totals[spend_type] = totals.get(spend_type, 0) + amount
+    top = sorted(totals, key=lambda spend_type: (-totals[spend_type], spend_type))[:top_n]
+
+    series = {spend_type: [0] * len(months) for spend_type in top}
+    if len(totals) > len(top):
+        series['other'] = [0] * len(months)
+    for month, spend_type, amount in cube:
+        series[spend_type if spend_type in top else 'other'][column[month]] += amount
+    return months, [(name, [database.cents_to_dollars(v) for v in values]) for name, values in series.items()]
+
+
+def load_category_data(db, start_month=None, end_month=None):
+    # Every category's spending per month, read from the SPEND_CUBE rollup
+    return spending_series(database.get_spending_cube(db, start_month, end_month))
+
+
+def forecast_overlay(months, balances, result):
+    """Balance history plus the forecast net amount and its 80% and 95% bands."""
+    def dollars(values):
+        return [database.cents_to_dollars(v) for v in values]
+    return (months, balances, result.months, dollars(result.net),
+            [dollars(band) for band in forecast.bands(result, forecast.Z_80)],
+            [dollars(band) for band in forecast.bands(result, forecast.Z_95)])
+
+
+def load_forecast_data(db, horizon=forecast.DEFAULT_HORIZON):
+    # The balance history with the forecast projected past its end
+    return forecast_overlay(*load_balance_data(db), forecast.forecast(db, horizon))
+
+
+def load_income_data(db):
+    # Fetch monthly income data from the database
+    income_data = database.get_monthly_income(db)
+    months = [row[0] for row in income_data]
+    incomes = [database.cents_to_dollars(row[1]) for row in income_data]
+    return months, incomes
+
+
+# The same graphs summed over several accounts. They take the account
+# database paths instead of a db; accounts.map_accounts reads every account
+# on its own connection.
+def load_combined_balance_data(paths):
+    balance_data = accounts.get_monthly_balance(paths)
+    return [row[0] for row in balance_data], [database.cents_to_dollars(row[1]) for row in balance_data]
+
+
+def load_combined_expenses_data(paths, month=None):
+    if month is None:
+        months = accounts.get_spending_months(paths)
+        month = months[-1] if months else None
+    expense_data = accounts.get_monthly_spending(paths, month) if month else []
+    return [row[0] for row in expense_data], [database.cents_to_dollars(row[1]) for row in expense_data], month
+
+
+def load_combined_income_data(paths):
+    income_data = accounts.get_monthly_income(paths)
+    return [row[0] for row in income_data], [database.cents_to_dollars(row[1]) for row in income_data]
+
+
+def load_combined_category_data(paths, start_month=None, end_month=None):
+    return spending_series(accounts.get_spending_cube(paths, start_month, end_month))
+
+
+def load_combined_forecast_data(paths, horizon=forecast.DEFAULT_HORIZON):
+    months, balances = load_combined_balance_data(paths)
+    # Every account is projected from the month after the latest of any of them
+    starts = [month for month in accounts.map_accounts(paths, forecast.first_forecast_month) if month]
+    start = max(starts) if starts else None
+    result = forecast.combine(accounts.map_accounts(paths, forecast.forecast, horizon, start))
+    return forecast_overlay(months, balances, result)
+
+
+GRAPH_LOADERS = {
+    'balance': load_balance_data,
+    'expenses': load_expenses_data,
+    'income': load_income_data,
+    'stacked': load_category_data,
+    'trend': load_category_data,
+    'forecast': load_forecast_data,
+}
+
+COMBINED_GRAPH_LOADERS = {
+    'balance': load_combined_balance_data,
+    'expenses': load_combined_expenses_data,
+    'income': load_combined_income_data,
+    'stacked': load_combined_category_data,
+    'trend': load_combined_category_data,
+    'forecast': load_combined_forecast_data,
+}
@@ -0,0 +1,258 @@
+import math
+
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+
+from chart_data import load_balance_data, load_category_data, load_expenses_data, load_forecast_data, load_income_data
+from diagnostics import query_stats
+
+
+def decimate(labels, values, max_points):
+    """Reduce a series to at most max_points buckets.
+
+    Each bucket keeps its first label and its largest-magnitude value, so
+    peaks survive. Buckets are anchored at the start of the series, which
+    means appending data only ever changes the last bucket.
+    """
+    if len(values) <= max_points:
+        return list(labels), list(values)
+    step = math.ceil(len(values) / max_points)
+    bucket_labels = labels[::step]
+    bucket_values = [max(values[start:start + step], key=abs) for start in range(0, len(values), step)]
+    return list(bucket_labels), bucket_values
+
+
+# How each graph type is drawn
+GRAPH_STYLES = {
+    'balance': {'kind': 'bar', 'color': 'blue', 'label': 'Balance',
+                'title': 'Monthly Balance', 'xlabel': 'Month', 'ylabel': 'Balance'},
+    'expenses': {'kind': 'bar', 'color': 'red', 'label': 'Expenses',
+                 'title': 'Monthly Expenses', 'xlabel': 'Category', 'ylabel': 'Amount'},
+    'income': {'kind': 'line', 'color': 'green', 'label': 'Income',
+               'title': 'Monthly Income', 'xlabel': 'Month', 'ylabel': 'Income'},
+    'stacked': {'title': 'Spending by Category', 'xlabel': 'Month', 'ylabel': 'Amount'},
+    'trend': {'title': 'Category Trends', 'xlabel': 'Month', 'ylabel': 'Amount'},
+    'forecast': {'title': 'Monthly Balance and Forecast', 'xlabel': 'Month', 'ylabel': 'Balance'},
+}
+
+
+class GraphWidget(FigureCanvas):
+    """Chart canvas that updates its artists in place.
+
+    The axes are only rebuilt when the graph type or the x labels change.
+    Otherwise bar heights and line data are updated on the existing artists
+    and, when the y axis still fits, just the series is redrawn over a cached
+    background (blitting). Long series are decimated to max_points.
+    """
+
+    max_points = 120
+    max_ticks = 12
+
+    def __init__(self, parent=None, width=5, height=4, dpi=100):
+        fig = Figure(figsize=(width, height), dpi=dpi)
+        self.ax = fig.add_subplot()
+        FigureCanvas.__init__(self, fig)
+        self.setParent(parent)
+
+        self._graph_type = None
+        self._labels = []
+        self._values = []
+        self._artists = []
+        self._background = None
+        self.mpl_connect('draw_event', self._on_draw)
+
+    def render(self, graph_type, data):
+        """Draw data produced by chart_data.GRAPH_LOADERS[graph_type]."""
+        with query_stats.span(f"render {graph_type}"):
+            getattr(self, f"render_{graph_type}")(data)
+
+    def plot_balance(self, db):
+        self.render('balance', load_balance_data(db))
+
+    def plot_expenses(self, db):
+        self.render('expenses', load_expenses_data(db))
+
+    def plot_income(self, db):
+        self.render('income', load_income_data(db))
+
+    def plot_stacked(self, db):
+        self.render('stacked', load_category_data(db))
+
+    def plot_trend(self, db):
+        self.render('trend', load_category_data(db))
+
+    def plot_forecast(self, db):
+        self.render('forecast', load_forecast_data(db))
+
+    def render_balance(self, data):
+        self._render_series('balance', *data)
+
+    def render_expenses(self, data):
+        categories, expenses, month = data
+        title = f"Expenses for {month}" if month else GRAPH_STYLES['expenses']['title']
+        if title != self.ax.get_title():
+            # Another month can have the same categories; rebuild for the new title
+            self._graph_type = None
+        self._render_series('expenses', categories, expenses)
+        if self._graph_type == 'expenses' and title != self.ax.get_title():
+            self.ax.set_title(title)
+            self.draw_idle()
+
+    def render_income(self, data):
+        self._render_series('income', *data)
+
+    def render_stacked(self, data):
+        """Stacked bars of each category's spending per month."""
+        months, series = data
+
+        def draw(positions):
+            bottom = [0] * len(months)
+            for name, values in series:
+                self.ax.bar(positions, values, bottom=bottom, label=name)
+                bottom = [b + v for b, v in zip(bottom, values)]
+        self._render_multi('stacked', months, series, draw)
+
+    def render_trend(self, data):
+        """One line per category across the months."""
+        months, series = data
+
+        def draw(positions):
+            for name, values in series:
+                self.ax.plot(positions, values, label=name)
+        self._render_multi('trend', months, series, draw)
+
+    def render_forecast(self, data):
+        """Balance bars with the forecast line and its bands past the last month."""
+        months, balances, forecast_months, net, band_80, band_95 = data
+        if not months:
+            return
+        # Future-dated rows can put bars inside or past the forecast
+        labels = sorted(set(months) | set(forecast_months))
+        column = {month: i for i, month in enumerate(labels)}
+        style = GRAPH_STYLES['balance']
+        by_month = dict(zip(months, balances))
+
+        def draw(_positions):
+            self.ax.bar([column[month] for month in months], balances, color=style['color'], label=style['label'])
+            if forecast_months:
+                x = [column[month] for month in forecast_months]
+                self.ax.fill_between(x, *band_95, color='orange', alpha=0.15, label='95% band')
+                self.ax.fill_between(x, *band_80, color='orange', alpha=0.3, label='80% band')
+                self.ax.plot(x, net, color='darkorange', marker='o', markersize=3, label='Forecast')
+        self._render_multi('forecast', labels, [('Balance', [by_month.get(month, 0) for month in labels])], draw)
+
+    def _render_multi(self, graph_type, months, series, draw):
+        # Multi-series charts are drawn from the small rollup and simply
+        # rebuilt; only the single-series charts are updated in place
+        if not months:
+            return
+        style = GRAPH_STYLES[graph_type]
+        self._graph_type, self._labels = graph_type, list(months)
+        self._values = [sum(values) for values in zip(*(values for _, values in series))]
+        self._artists = []
+
+        self.ax.clear()
+        draw(range(len(months)))
+        self.ax.set_title(style['title'])
+        self.ax.set_xlabel(style['xlabel'])
+        self.ax.set_ylabel(style['ylabel'])
+        self.ax.legend(fontsize='small', ncol=2)
+        self._set_limits()
+        self.ax.tick_params(axis='x', labelrotation=30, labelsize='small')
+        if graph_type in ('trend', 'forecast'):
+            self.ax.relim()
+            self.ax.autoscale(axis='y')
+        self.draw()
+
+    def _render_series(self, graph_type, labels, values):
+        if not labels:  # Check if data exists
+            return
+        labels, values = decimate(labels, values, self.max_points)
+
+        known = len(self._labels)
+        if graph_type != self._graph_type or labels[:known] != self._labels:
+            self._rebuild(graph_type, labels, values)
+            return
+
+        style = GRAPH_STYLES[graph_type]
+        appended = len(labels) > known
+        changed = appended or values[:known] != self._values
+
+        if style['kind'] == 'bar':
+            for bar, old, new in zip(self._artists, self._values, values):
+                if old != new:
+                    bar.set_height(new)
+            if appended:
+                self._artists.extend(self.ax.bar(
+                    range(known, len(labels)), values[known:], color=style['color'], animated=True,
+                ))
+        else:
+            self._artists[0].set_data(range(len(values)), values)
+
+        self._labels, self._values = labels, values
+        if not changed:
+            return
+        if appended or not self._fits_ylim(values):
+            # The axes themselves change, so everything has to be redrawn
+            self._set_limits()
+            self.draw_idle()
+        else:
+            self._blit_series()
+
+    def _rebuild(self, graph_type, labels, values):
+        style = GRAPH_STYLES[graph_type]
+        self._graph_type, self._labels, self._values = graph_type, labels, values
+
+        # Clear the axes and plot the data
+        self.ax.clear()
+        positions = range(len(labels))
+        if style['kind'] == 'bar':
+            self._artists = list(self.ax.bar(positions, values, label=style['label'],
+                                             color=style['color'], animated=True))
+        else:
+            self._artists = self.ax.plot(positions, values, label=style['label'],
+                                         color=style['color'], marker='o', animated=True)
+        self.ax.set_title(style['title'])
+        self.ax.set_xlabel(style['xlabel'])
+        self.ax.set_ylabel(style['ylabel'])
+        self.ax.legend()
+
+        # Adjust x-axis labels for better readability (if needed)
+        self.ax.tick_params(axis='x', rotation=0)
+
+        self._set_limits()
+        self.draw()
+
+    def _set_limits(self):
+        # Label at most max_ticks positions so long histories stay readable
+        step = max(1, math.ceil(len(self._labels) / self.max_ticks))
+        positions = range(0, len(self._labels), step)
+        self.ax.set_xticks(positions)
+        self.ax.set_xticklabels([self._labels[i] for i in positions])
+        self.ax.set_xlim(-0.5, len(self._labels) - 0.5)
+
+        low, high = min(self._values + [0]), max(self._values + [0])
+        margin = (high - low) * 0.05 or 1
+        self.ax.set_ylim(low - margin, high + margin)
+
+    def _fits_ylim(self, values):
+        low, high = self.ax.get_ylim()
+        return low <= min(values + [0]) and max(values + [0]) <= high
+
+    def _on_draw(self, event):
+        # The series artists are animated, so a full draw leaves them out;
+        # cache that background and paint them on top
+        self._background = self.copy_from_bbox(self.figure.bbox)
+        self._draw_series()
+
+    def _draw_series(self):
+        for artist in self._artists:
+            self.figure.draw_artist(artist)
+
+    def _blit_series(self):
+        if self._background is None:
+            self.draw_idle()
+            return
+        self.restore_region(self._background)
+        self._draw_series()
+        self.blit(self.figure.bbox)
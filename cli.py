@@ -0,0 +1,319 @@
+"""Non-interactive command line interface for scripts and scheduled reports.
+
+    python -m cli balance
+    python -m cli --account Business balance
+    python -m cli accounts
+    python -m cli monthly --start 2024-01 --end 2024-12 --format json
+    python -m cli add income 2024-09-15 2500
+    python -m cli add spend 2024-09-16 groceries 84.20
+    python -m cli import statement.csv
+    python -m cli export backup/ --as columnar
+    python -m cli categories --top 5 --start 2024-01 --end 2024-12
+    python -m cli forecast --months 12
+    python -m cli loan 250000 6.5 1800
+    python -m cli plan 900 --loan car:12000:6.9:250 --loan card:4000:24.9:120
+    python -m cli --stats stats.json monthly
+
+Results are written to stdout as CSV (default) or JSON Lines, one record per
+line as it is produced. Only the standard library and the database, accounts,
+importer, interest, planner, forecast and export modules are imported; Qt, matplotlib and NumPy never are.
+"""
+import argparse
+import calendar
+import csv
+import json
+import sys
+
+import database
+
+FORMATS = ('csv', 'json')
+
+
+class RecordWriter:
+    """Streams records to a file as CSV rows or JSON Lines."""
+
+    def __init__(self, stream, fmt, fields):
+        self.stream = stream
+        self.fmt = fmt
+        self.fields = fields
+        if fmt == 'csv':
+            self._csv = csv.writer(stream, lineterminator='\n')
+            self._csv.writerow(fields)
+
+    def write(self, values):
+        if self.fmt == 'csv':
+            self._csv.writerow(values)
+        else:
+            self.stream.write(json.dumps(dict(zip(self.fields, values))) + '\n')
+
+
+def dollars(cents):
+    return database.format_cents(cents, grouping=False)
+
+
+def month_end(text):
+    """Last day of a 'YYYY-MM' month; full dates are returned unchanged."""
+    if len(text.strip()) != 7:
+        return text
+    year, month = map(int, text.split('-'))
+    return f"{year:04d}-{month:02d}-{calendar.monthrange(year, month)[1]:02d}"
+
+
+def open_database(path):
+    db = database.Database(path)
+    database.migrate(db)
+    return db
+
+
+def command_add(args, out):
+    db = open_database(args.db)
+    # Validate up front so bad input gives an error status instead of a message
+    database.parse_date(args.date)
+    cents = database.to_cents(args.amount)
+    if args.kind == 'income':
+        database.add_income(db, args.date, args.amount)
+        record = ('income', args.date, '', dollars(cents))
+    else:
+        if not args.type:
+            raise ValueError("add spend needs an expense type")
+        database.add_spend(db, args.date, args.type, args.amount)
+        record = ('spend', args.date, args.type, dollars(cents))
+    writer = RecordWriter(out, args.format, ['kind', 'date', 'type', 'amount'])
+    writer.write(record)
+    db.close()
+
+
+def command_import(args, out):
+    import importer
+
+    db = open_database(args.db)
+    writer = RecordWriter(out, args.format, ['imported'])
+
+    def report(count):
+        if args.progress:
+            print(f"Imported {count} transactions...", file=sys.stderr)
+
+    count = importer.import_files(db, args.files, chunk_size=args.chunk_size, progress=report)
+    writer.write((count,))
+    db.close()
+
+
+def command_export(args, out):
+    import export
+
+    db = open_database(args.db)
+    writer = RecordWriter(out, args.format, ['table', 'rows', 'path'])
+    for table, count, path in export.export_tables(db, args.directory, args.tables or list(export.EXPORTS),
+                                                   args.export_format, args.chunk_size):
+        writer.write((table, count, path))
+    db.close()
+
+
+def command_balance(args, out):
+    db = open_database(args.db)
+    writer = RecordWriter(out, args.format, ['income', 'spending', 'balance'])
+    income = db.get_total_income()
+    spending = db.get_total_expenses()
+    writer.write((dollars(income), dollars(spending), dollars(income - spending)))
+    db.close()
+
+
+def command_accounts(args, out):
+    import accounts
+
+    if args.add:
+        accounts.add_account(args.add)
+    writer = RecordWriter(out, args.format, ['account', 'income', 'spending', 'balance'])
+    # Every account is read in parallel on its own connection
+    totals = accounts.get_account_totals(accounts.load_accounts())
+    for name, income, spending in totals:
+        writer.write((name, dollars(income), dollars(spending), dollars(income - spending)))
+    income = sum(row[1] for row in totals)
+    spending = sum(row[2] for row in totals)
+    writer.write(('All Accounts', dollars(income), dollars(spending), dollars(income - spending)))
+
+
+def command_monthly(args, out):
+    db = open_database(args.db)
+    if args.bucket == 'month' and args.category is None:
+        writer = RecordWriter(out, args.format, ['month', 'income', 'spending', 'balance'])
+        start = args.start[:7] if args.start else None
+        end = args.end[:7] if args.end else None
+        for month, income, spending, balance in database.iter_monthly_summary(db, start, end):
+            writer.write((month, dollars(income), dollars(spending), dollars(balance)))
+    else:
+        # Other bucket sizes come from the day-level range aggregation
+        start = args.start or '0001-01-01'
+        end = month_end(args.end) if args.end else '9999-12-31'
+        writer = RecordWriter(out, args.format, ['period', 'income', 'spending', 'balance'])
+        income = dict(database.get_bucketed_totals(db, 'INCOME', start, end, args.bucket)) if args.category is None else {}
+        spending = dict(database.get_bucketed_totals(db, 'SPEND', start, end, args.bucket, category=args.category))
+        for period in sorted(set(income) | set(spending)):
+            i, s = income.get(period, 0), spending.get(period, 0)
+            writer.write((period, dollars(i), dollars(s), dollars(i - s)))
+    db.close()
+
+
+def command_categories(args, out):
+    db = open_database(args.db)
+    writer = RecordWriter(out, args.format, ['category', 'spending'])
+    start = args.start[:7] if args.start else None
+    end = args.end[:7] if args.end else None
+    for category, amount in database.get_top_categories(db, args.top, start, end):
+        writer.write((category, dollars(amount)))
+    db.close()
+
+
+def command_forecast(args, out):
+    import forecast
+
+    db = open_database(args.db)
+    result = forecast.forecast(db, args.months)
+    db.close()
+    writer = RecordWriter(out, args.format, ['month', 'income', 'spending', 'net', 'low_80', 'high_80',
+                                             'low_95', 'high_95'])
+    (low_80, high_80), (low_95, high_95) = forecast.bands(result, forecast.Z_80), forecast.bands(result, forecast.Z_95)
+    for row in zip(result.months, result.income, result.spending, result.net, low_80, high_80, low_95, high_95):
+        writer.write((row[0],) + tuple(dollars(round(value)) for value in row[1:]))
+
+
+def command_loan(args, out):
+    import interest
+
+    rate = args.rate / 100
+    summary = interest.loan_summary(args.principal, rate, args.payment)
+    writer = RecordWriter(out, args.format, ['principal', 'rate', 'payment', 'months', 'total_paid',
+                                             'total_interest', 'months_to_save'])
+    writer.write((f"{args.principal:.2f}", f"{args.rate:g}", f"{args.payment:.2f}", summary.months,
+                  f"{summary.total_paid:.2f}", f"{summary.total_interest:.2f}",
+                  f"{args.principal / args.payment:.2f}"))
+
+
+def loan_spec(text):
+    """Parse NAME:BALANCE:RATE:MINIMUM, with the rate in percent."""
+    import planner
+
+    try:
+        name, balance, rate, minimum = text.split(':')
+        return planner.Loan(name, float(balance), float(rate) / 100, float(minimum))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected NAME:BALANCE:RATE:MINIMUM, got {text!r}")
+
+
+def command_plan(args, out):
+    import planner
+
+    strategies = [args.order.split(',')] if args.order else ['avalanche', 'snowball']
+    if args.schedule:
+        rows = planner.plan_schedule(args.loans, args.budget, strategies[0])
+        writer = RecordWriter(out, args.format, ['month', 'loan', 'payment', 'interest', 'principal', 'balance'])
+        for row in rows:
+            writer.write((row.month, row.loan, f"{row.payment:.2f}", f"{row.interest:.2f}",
+                          f"{row.principal:.2f}", f"{row.balance:.2f}"))
+        return
+
+    results = planner.compare_strategies(args.loans, args.budget, strategies)
+    writer = RecordWriter(out, args.format, ['strategy', 'order', 'months', 'total_paid', 'total_interest'])
+    for result in results:
+        writer.write((result.strategy, ' > '.join(result.order), result.months,
+                      f"{result.total_paid:.2f}", f"{result.total_interest:.2f}"))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m cli', description="Finance planner reports and data entry.")
+    parser.add_argument('--db', default='TransactionDatabase.db', help="database file (default: %(default)s)")
+    parser.add_argument('--account', help="use this account's database instead of --db")
+    parser.add_argument('--format', choices=FORMATS, default='csv', help="output format (default: %(default)s)")
+    parser.add_argument('--stats', metavar='FILE', help="record query timings and write them to FILE as JSON")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    add = commands.add_parser('add', help="record one income or spending entry")
+    add.add_argument('kind', choices=('income', 'spend'))
+    add.add_argument('date', help="YYYY-MM-DD or YYYY-MM")
+    add.add_argument('type', nargs='?', help="expense type (spend only)")
+    add.add_argument('amount')
+    add.set_defaults(func=command_add)
+
+    import_ = commands.add_parser('import', help="bulk import CSV, QIF or OFX statements")
+    import_.add_argument('files', nargs='+')
+    import_.add_argument('--chunk-size', type=int, default=1000)
+    import_.add_argument('--progress', action='store_true', help="report progress on stderr")
+    import_.set_defaults(func=command_import)
+
+    export = commands.add_parser('export', help="stream tables to CSV or columnar binary files")
+    export.add_argument('directory')
+    export.add_argument('--as', dest='export_format', choices=('csv', 'columnar'), default='csv')
+    export.add_argument('--table', dest='tables', action='append', choices=('INCOME', 'SPEND', 'MONTHLY_BALANCE'),
+                        help="table to export (repeatable; default: all)")
+    export.add_argument('--chunk-size', type=int, default=10000)
+    export.set_defaults(func=command_export)
+
+    balance = commands.add_parser('balance', help="all-time income, spending and running balance")
+    balance.set_defaults(func=command_balance)
+
+    accounts = commands.add_parser('accounts', help="totals for every account and all of them combined")
+    accounts.add_argument('--add', metavar='NAME', help="create a new account first")
+    accounts.set_defaults(func=command_accounts)
+
+    monthly = commands.add_parser('monthly', help="income, spending and balance per period")
+    monthly.add_argument('--start', help="first month (YYYY-MM) or day (YYYY-MM-DD)")
+    monthly.add_argument('--end', help="last month (YYYY-MM) or day (YYYY-MM-DD)")
+    monthly.add_argument('--bucket', choices=('day', 'week', 'month', 'quarter', 'year'), default='month')
+    monthly.add_argument('--category', help="only this spending category")
+    monthly.set_defaults(func=command_monthly)
+
+    categories = commands.add_parser('categories', help="categories with the most spending")
+    categories.add_argument('--top', type=int, default=5, help="how many categories (default: %(default)s)")
+    categories.add_argument('--start', help="first month (YYYY-MM)")
+    categories.add_argument('--end', help="last month (YYYY-MM)")
+    categories.set_defaults(func=command_categories)
+
+    forecast = commands.add_parser('forecast', help="projected income, spending and net with 80%%/95%% bands")
+    forecast.add_argument('--months', type=int, default=12, help="months ahead (default: %(default)s)")
+    forecast.set_defaults(func=command_forecast)
+
+    loan = commands.add_parser('loan', help="payoff time and cost of a loan")
+    loan.add_argument('principal', type=float)
+    loan.add_argument('rate', type=float, help="annual interest rate in percent")
+    loan.add_argument('payment', type=float, help="monthly payment")
+    loan.set_defaults(func=command_loan)
+
+    plan = commands.add_parser('plan', help="pay off several loans from one monthly budget")
+    plan.add_argument('budget', type=float, help="total monthly payment across all loans")
+    plan.add_argument('--loan', dest='loans', action='append', type=loan_spec, required=True,
+                      metavar='NAME:BALANCE:RATE:MINIMUM', help="a loan, rate in percent (repeatable)")
+    plan.add_argument('--order', help="custom payoff order as comma-separated loan names "
+                                      "(default: compare avalanche and snowball)")
+    plan.add_argument('--schedule', action='store_true',
+                      help="print the month-by-month schedule of the first strategy instead of totals")
+    plan.set_defaults(func=command_plan)
+    return parser
+
+
+def main(argv=None, out=sys.stdout):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.stats:
+        # Before any database is opened, so every connection is traced
+        from diagnostics import query_stats
+        query_stats.enable()
+    try:
+        if args.account:
+            import accounts
+            args.db = accounts.account_path(args.account)
+        try:
+            args.func(args, out)
+        finally:
+            if args.stats:
+                query_stats.dump(args.stats)
+    except BrokenPipeError:
+        # Output was piped into something like head that stopped reading
+        return 0
+    except (ValueError, OSError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,20 +1,125 @@
+import functools
+import itertools
+import os
 import sqlite3
-from datetime import date
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 import re
 
+from diagnostics import query_stats
+
+# Connection settings applied to every Database. WAL lets readers run
+# alongside a writer and, together with synchronous=NORMAL, turns most
+# commits into a single sequential append instead of several fsyncs.
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -16000,  # Negative values are in KiB, so about 16 MB
+    'mmap_size': 256 * 1024 * 1024,
+}
+
+# sqlite3 keeps compiled statements in a per-connection LRU keyed by the SQL
+# text, so the fixed queries below are prepared once and reused.
+STATEMENT_CACHE_SIZE = 256
+
+# Date holds the 'YYYY-MM' month bucket, DateKey the day as YYYYMMDD
+INSERT_INCOME_SQL = "INSERT INTO INCOME (Date, DateKey, Amount) VALUES (?, ?, ?)"
+INSERT_SPEND_SQL = "INSERT INTO SPEND (Date, DateKey, Type, Amount) VALUES (?, ?, ?, ?)"
+TOTAL_INCOME_SQL = "SELECT Income FROM RUNNING_TOTALS WHERE Id = 1"
+TOTAL_SPEND_SQL = "SELECT Spend FROM RUNNING_TOTALS WHERE Id = 1"
+
+# Cache keys for in-memory databases; never reused, unlike id()
+_memory_keys = itertools.count(1)
+
+
 class Database:
-    def __init__(self, db_name='TransactionDatabase.db'):
-        self.connection = sqlite3.connect(db_name)
+    def __init__(self, db_name='TransactionDatabase.db', pragmas=None):
+        """Open db_name. pragmas overrides entries of DEFAULT_PRAGMAS; a value
+        of None leaves that setting at SQLite's default."""
+        self.db_name = db_name
+        # Identifies the underlying data for the query cache; every in-memory
+        # database is separate
+        self.cache_key = ('memory', next(_memory_keys)) if db_name == ':memory:' else os.path.abspath(db_name)
+        self.connection = sqlite3.connect(db_name, cached_statements=STATEMENT_CACHE_SIZE)
         self.cursor = self.connection.cursor()
+        self._transaction_depth = 0
+        self._data_version = None
+
+        self.pragmas = dict(DEFAULT_PRAGMAS, **(pragmas or {}))
+        for name, value in self.pragmas.items():
+            if value is not None:
+                self.connection.execute(f"PRAGMA {name} = {value}")
+        if query_stats.enabled:
+            # Counts every statement SQLite runs, trigger bodies included
+            self.connection.set_trace_callback(query_stats.trace)
+
+    def _timed(self, run, query, params, explain_params=None):
+        # Only called while query_stats is enabled
+        start = time.perf_counter()
+        result = run(query, params)
+        elapsed = time.perf_counter() - start
+        rows = len(result) if isinstance(result, list) else max(self.cursor.rowcount, 0)
+        query_stats.record(self.connection, query, params if explain_params is None else explain_params,
+                           elapsed, rows)
+        return result
+
+    def changed_elsewhere(self):
+        """True if another connection has committed since the last call.
+
+        Uses PRAGMA data_version, which only moves for commits made through
+        other connections, including ones in other processes. The first call
+        only records the version, so a fresh pool connection doesn't throw
+        the cache away.
+        """
+        version = self.connection.execute("PRAGMA data_version").fetchone()[0]
+        changed = self._data_version is not None and version != self._data_version
+        self._data_version = version
+        return changed
 
     def execute(self, query, params=()):
-        self.cursor.execute(query, params)
+        if query_stats.enabled:
+            self._timed(self.cursor.execute, query, params)
+        else:
+            self.cursor.execute(query, params)
 
     def fetchall(self):
         return self.cursor.fetchall()
 
     def commit(self):
-        self.connection.commit()
+        # Inside a transaction() block the commit happens when the block exits
+        if self._transaction_depth == 0:
+            self.connection.commit()
+
+    def rollback(self):
+        self.connection.rollback()
+
+    @contextmanager
+    def transaction(self, immediate=False):
+        """Group several statements into one atomic commit.
+
+        The helpers below (insert_data, update_data, ...) skip their own commit
+        while a block is open. Blocks may be nested; only the outermost one
+        commits, and an exception anywhere rolls the whole group back.
+        immediate takes the write lock up front, for blocks that read what
+        they are about to change.
+        """
+        if self._transaction_depth == 0 and not self.connection.in_transaction:
+            self.connection.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        self._transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0:
+                self.rollback()
+            raise
+        else:
+            self._transaction_depth -= 1
+            self.commit()
 
     def close(self):
         self.connection.close()
@@ -24,13 +129,51 @@ class Database:
         self.commit()
 
     def insert_data(self, query, data):
-        self.cursor.executemany(query, data)
+        if query_stats.enabled:
+            data = list(data)
+            self._timed(self.cursor.executemany, query, data, data[0] if data else ())
+        else:
+            self.cursor.executemany(query, data)
         self.commit()
 
     def get_data(self, query, params=()):
+        if query_stats.enabled:
+            return self._timed(lambda q, p: self.cursor.execute(q, p).fetchall(), query, params)
         self.execute(query, params)
         return self.fetchall()
 
+    def iter_chunks(self, query, params=(), chunk_size=1000):
+        """Yield the query's rows as lists of at most chunk_size rows.
+
+        Uses its own cursor and fetchmany, so only one chunk is ever in
+        memory and other statements can run between chunks.
+        """
+        cursor = self.connection.cursor()
+        # Time spent in SQLite only, not in the caller between chunks
+        elapsed = 0.0
+        count = 0
+        try:
+            start = time.perf_counter()
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if query_stats.enabled:
+                    elapsed += time.perf_counter() - start
+                    count += len(rows)
+                if not rows:
+                    break
+                yield rows
+                start = time.perf_counter()
+        finally:
+            cursor.close()
+            if query_stats.enabled:
+                query_stats.record(self.connection, query, params, elapsed, count)
+
+    def iter_data(self, query, params=(), chunk_size=1000):
+        """Like get_data, but yields rows one at a time."""
+        for rows in self.iter_chunks(query, params, chunk_size):
+            yield from rows
+
     def update_data(self, query, params=()):
         self.execute(query, params)
         self.commit()
@@ -40,18 +183,154 @@ class Database:
         self.commit()
 
     def get_total_income(self):
-        """Fetch the total income from the database."""
-        cursor = self.connection.cursor()
-        cursor.execute("SELECT SUM(amount) FROM INCOME")
-        result = cursor.fetchone()
-        return result[0] if result[0] else 0.0
+        """Fetch the total income from the database, in cents."""
+        if query_stats.enabled:
+            result = self._timed(lambda q, p: self.connection.execute(q, p).fetchall(), TOTAL_INCOME_SQL, ())
+            result = result[0] if result else None
+        else:
+            cursor = self.connection.cursor()
+            cursor.execute(TOTAL_INCOME_SQL)
+            result = cursor.fetchone()
+        return result[0] if result and result[0] else 0
 
     def get_total_expenses(self):
-        """Fetch the total expenses from the database."""
-        cursor = self.connection.cursor()
-        cursor.execute("SELECT SUM(amount) FROM SPEND")
-        result = cursor.fetchone()
-        return result[0] if result[0] else 0.0
+        """Fetch the total expenses from the database, in cents."""
+        if query_stats.enabled:
+            result = self._timed(lambda q, p: self.connection.execute(q, p).fetchall(), TOTAL_SPEND_SQL, ())
+            result = result[0] if result else None
+        else:
+            cursor = self.connection.cursor()
+            cursor.execute(TOTAL_SPEND_SQL)
+            result = cursor.fetchone()
+        return result[0] if result and result[0] else 0
+
+
+_local = threading.local()
+
+
+def thread_database(db_name):
+    """Return the calling thread's own connection to db_name.
+
+    sqlite3 connections can't be shared between threads, so every thread
+    opens its own the first time it needs one and keeps it for the work
+    that follows.
+    """
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    if db_name not in connections:
+        connections[db_name] = Database(db_name)
+    return connections[db_name]
+
+
+# Query Result Cache
+# Writes to these tables also change the tables they map to, via triggers
+TABLE_DEPENDENTS = {
+    'INCOME': ('MONTHLY_BALANCE', 'RUNNING_TOTALS'),
+    'SPEND': ('MONTHLY_BALANCE', 'RUNNING_TOTALS', 'SPEND_CUBE'),
+}
+
+
+class QueryCache:
+    """LRU cache for the aggregate readers, invalidated by write generations.
+
+    Every table has a generation counter per database that writers bump
+    through mark_changed(). A cached result remembers the generations of the
+    tables it was read from and is only reused while they are unchanged, so
+    a write invalidates exactly the entries that depend on it. The cache is
+    shared by all connections in this process. Writes it wasn't told about,
+    such as the CLI or a second window committing to the same file, show up
+    as a new data_version on a connection that has read through the cache
+    before and invalidate every entry for that database.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (generations, result)
+        self._generations = defaultdict(int)  # (cache key, table) -> generation
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _snapshot(self, db, tables):
+        return tuple(self._generations[(db.cache_key, table)] for table in tables)
+
+    def bump(self, db, *tables):
+        with self._lock:
+            for table in tables:
+                for changed in (table,) + TABLE_DEPENDENTS.get(table, ()):
+                    self._generations[(db.cache_key, changed)] += 1
+
+    def bump_all(self, db):
+        with self._lock:
+            for generation_key in self._generations:
+                if generation_key[0] == db.cache_key:
+                    self._generations[generation_key] += 1
+
+    def get(self, db, tables, key, compute):
+        if db.changed_elsewhere():
+            self.bump_all(db)
+        key = (db.cache_key,) + key
+        with self._lock:
+            snapshot = self._snapshot(db, tables)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == snapshot:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        result = compute()
+
+        with self._lock:
+            # Only store the result if no write happened while computing it
+            if self._snapshot(db, tables) == snapshot:
+                self._entries[key] = (snapshot, result)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+query_cache = QueryCache()
+
+
+def cached_query(*tables):
+    """Cache a reader's results in query_cache, keyed by its arguments.
+
+    tables lists what the reader reads from. The undecorated function stays
+    available as .uncached.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(db, *args, **kwargs):
+            key = (func.__name__,) + args + tuple(sorted(kwargs.items()))
+            return query_cache.get(db, tables, key, lambda: func(db, *args, **kwargs))
+        wrapper.uncached = func
+        return wrapper
+    return decorator
+
+
+def mark_changed(db, *tables):
+    """Record a write to tables so dependent cached results are recomputed."""
+    query_cache.bump(db, *tables)
 
 
 # Database Table Definitions
@@ -60,7 +339,7 @@ def create_spend_table(db):
     CREATE TABLE IF NOT EXISTS SPEND (
         Date TEXT NOT NULL,
         Type TEXT NOT NULL,
-        Amount INTEGER NOT NULL
+        Amount INTEGER NOT NULL  -- cents from schema version 5
     );
     """
     db.create_table(spend_table)
@@ -70,7 +349,7 @@ def create_income_table(db):
     income_table = """
     CREATE TABLE IF NOT EXISTS INCOME (
         Date TEXT NOT NULL,
-        Amount INTEGER NOT NULL
+        Amount INTEGER NOT NULL  -- cents from schema version 5
     );
     """
     db.create_table(income_table)
@@ -84,48 +363,530 @@ def create_monthly_balance_table(db):
     );
     """
     db.create_table(monthly_balance_table)
+    create_monthly_balance_triggers(db)
+
+
+def create_monthly_balance_triggers(db):
+    """Keep MONTHLY_BALANCE up to date by applying each write as a delta.
+
+    Every insert, update or delete on INCOME or SPEND adjusts only the
+    affected month's row, so a write costs the same no matter how much
+    history is stored.
+    """
+    for table, sign in (('INCOME', ''), ('SPEND', '-')):
+        apply_new = f"""
+            INSERT INTO MONTHLY_BALANCE (Month, Balance) VALUES (NEW.Date, {sign}NEW.Amount)
+            ON CONFLICT(Month) DO UPDATE SET Balance = Balance + excluded.Balance;
+        """
+        revert_old = f"""
+            INSERT INTO MONTHLY_BALANCE (Month, Balance) VALUES (OLD.Date, -({sign}OLD.Amount))
+            ON CONFLICT(Month) DO UPDATE SET Balance = Balance + excluded.Balance;
+        """
+        db.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {table.lower()}_balance_insert AFTER INSERT ON {table}
+        BEGIN {apply_new} END;
+        """)
+        db.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {table.lower()}_balance_delete AFTER DELETE ON {table}
+        BEGIN {revert_old} END;
+        """)
+        db.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {table.lower()}_balance_update AFTER UPDATE OF Date, Amount ON {table}
+        BEGIN {revert_old} {apply_new} END;
+        """)
+    db.commit()
+
+
+def create_running_totals_table(db):
+    """Single-row table holding the all-time income and spending totals.
+
+    It is seeded from the current sums when first created and then kept in
+    step by triggers in the same transaction as each write, so the running
+    balance is a one-row lookup.
+    """
+    running_totals_table = """
+    CREATE TABLE IF NOT EXISTS RUNNING_TOTALS (
+        Id INTEGER PRIMARY KEY CHECK (Id = 1),
+        Income INTEGER NOT NULL,
+        Spend INTEGER NOT NULL
+    );
+    """
+    db.create_table(running_totals_table)
+    db.update_data("""
+    INSERT OR IGNORE INTO RUNNING_TOTALS (Id, Income, Spend)
+    VALUES (1, (SELECT IFNULL(SUM(Amount), 0) FROM INCOME), (SELECT IFNULL(SUM(Amount), 0) FROM SPEND))
+    """)
+    create_running_totals_triggers(db)
+
+
+def create_running_totals_triggers(db):
+    for table, column in (('INCOME', 'Income'), ('SPEND', 'Spend')):
+        db.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {table.lower()}_totals_insert AFTER INSERT ON {table}
+        BEGIN UPDATE RUNNING_TOTALS SET {column} = {column} + NEW.Amount WHERE Id = 1; END;
+        """)
+        db.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {table.lower()}_totals_delete AFTER DELETE ON {table}
+        BEGIN UPDATE RUNNING_TOTALS SET {column} = {column} - OLD.Amount WHERE Id = 1; END;
+        """)
+        db.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {table.lower()}_totals_update AFTER UPDATE OF Amount ON {table}
+        BEGIN UPDATE RUNNING_TOTALS SET {column} = {column} - OLD.Amount + NEW.Amount WHERE Id = 1; END;
+        """)
+    db.commit()
+
+
+def create_spend_cube_table(db):
+    """Spending rolled up per (month, category), maintained by triggers.
+
+    Seeded from SPEND when first created. Each write then adjusts only the
+    cells it touches, and a cell whose last row is deleted goes away, so
+    reading any slice of the history costs one primary-key range scan over
+    the cells instead of a GROUP BY over SPEND.
+    """
+    spend_cube_table = """
+    CREATE TABLE IF NOT EXISTS SPEND_CUBE (
+        Month TEXT NOT NULL,
+        Type TEXT NOT NULL,
+        Amount INTEGER NOT NULL,
+        Count INTEGER NOT NULL,
+        PRIMARY KEY (Month, Type)
+    ) WITHOUT ROWID;
+    """
+    db.create_table(spend_cube_table)
+    db.update_data("""
+    INSERT OR IGNORE INTO SPEND_CUBE (Month, Type, Amount, Count)
+    SELECT Date, Type, SUM(Amount), COUNT(*) FROM SPEND GROUP BY Date, Type
+    """)
+    create_spend_cube_triggers(db)
+
+
+def create_spend_cube_triggers(db):
+    apply_new = """
+        INSERT INTO SPEND_CUBE (Month, Type, Amount, Count) VALUES (NEW.Date, NEW.Type, NEW.Amount, 1)
+        ON CONFLICT(Month, Type) DO UPDATE SET Amount = Amount + excluded.Amount, Count = Count + 1;
+    """
+    revert_old = """
+        UPDATE SPEND_CUBE SET Amount = Amount - OLD.Amount, Count = Count - 1
+        WHERE Month = OLD.Date AND Type = OLD.Type;
+        DELETE FROM SPEND_CUBE WHERE Month = OLD.Date AND Type = OLD.Type AND Count = 0;
+    """
+    db.execute(f"CREATE TRIGGER IF NOT EXISTS spend_cube_insert AFTER INSERT ON SPEND BEGIN {apply_new} END;")
+    db.execute(f"CREATE TRIGGER IF NOT EXISTS spend_cube_delete AFTER DELETE ON SPEND BEGIN {revert_old} END;")
+    db.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS spend_cube_update AFTER UPDATE OF Date, Type, Amount ON SPEND
+    BEGIN {revert_old} {apply_new} END;
+    """)
+    db.commit()
+
+
+def create_forecast_state_table(db):
+    """Persisted smoothing state of the forecast models, one row per series.
+
+    forecast.update_forecast folds each month into its series once the
+    month is over. The triggers only forget a series when a write lands in
+    a month it has already folded in, so it is rebuilt on the next read;
+    ordinary writes to the current month never touch this table.
+    """
+    forecast_state_table = """
+    CREATE TABLE IF NOT EXISTS FORECAST_STATE (
+        Series TEXT PRIMARY KEY,
+        Month TEXT NOT NULL,
+        Level REAL NOT NULL,
+        Trend REAL NOT NULL,
+        SSE REAL NOT NULL,
+        Count INTEGER NOT NULL
+    ) WITHOUT ROWID;
+    """
+    db.create_table(forecast_state_table)
+    create_forecast_state_triggers(db)
+
+
+def create_forecast_state_triggers(db):
+    def forget(table, row):
+        series = "'INCOME'" if table == 'INCOME' else f"'SPEND:' || {row}.Type"
+        return f"DELETE FROM FORECAST_STATE WHERE Series = {series} AND Month >= {row}.Date;"
+
+    for table, columns in (('INCOME', 'Date, Amount'), ('SPEND', 'Date, Type, Amount')):
+        name = table.lower()
+        db.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {name}_forecast_insert AFTER INSERT ON {table}
+        BEGIN {forget(table, 'NEW')} END;
+        """)
+        db.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {name}_forecast_delete AFTER DELETE ON {table}
+        BEGIN {forget(table, 'OLD')} END;
+        """)
+        db.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {name}_forecast_update AFTER UPDATE OF {columns} ON {table}
+        BEGIN {forget(table, 'OLD')} {forget(table, 'NEW')} END;
+        """)
+    db.commit()
+
+
+def create_applied_writes_table(db):
+    """Single-row table with the sequence number of the last journaled write.
+
+    journal.apply_entries advances it in the same transaction as the rows,
+    so a journal replayed after a crash skips whatever already committed.
+    """
+    applied_writes_table = """
+    CREATE TABLE IF NOT EXISTS APPLIED_WRITES (
+        Id INTEGER PRIMARY KEY CHECK (Id = 1),
+        Seq INTEGER NOT NULL
+    );
+    """
+    db.create_table(applied_writes_table)
+    db.update_data("INSERT OR IGNORE INTO APPLIED_WRITES (Id, Seq) VALUES (1, 0)")
+
+
+def key_applied_writes_by_writer(db):
+    """Track the last applied journal write per writer instead of globally.
+
+    Every write-behind queue numbers its writes from 1 under its own writer
+    id, so queues in different windows or processes never share a sequence.
+    The old single row becomes the entry of writer '', which is what
+    journal entries written before writer ids existed are read as.
+    """
+    db.execute("ALTER TABLE APPLIED_WRITES RENAME TO APPLIED_WRITES_OLD")
+    db.execute("""
+    CREATE TABLE APPLIED_WRITES (
+        Writer TEXT PRIMARY KEY,
+        Seq INTEGER NOT NULL
+    ) WITHOUT ROWID
+    """)
+    db.execute("INSERT INTO APPLIED_WRITES (Writer, Seq) SELECT '', Seq FROM APPLIED_WRITES_OLD")
+    db.execute("DROP TABLE APPLIED_WRITES_OLD")
+    db.commit()
+
+
+def create_indexes(db):
+    """Covering indexes so the monthly queries never touch the base tables."""
+    db.execute("CREATE INDEX IF NOT EXISTS idx_spend_date_type_amount ON SPEND (Date, Type, Amount)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_income_date_amount ON INCOME (Date, Amount)")
+    db.commit()
+
+
+def _table_columns(db, table):
+    return [row[1] for row in db.get_data(f"PRAGMA table_info({table})")]
+
+
+def add_date_keys(db):
+    """Give INCOME and SPEND an indexed integer day key.
+
+    Existing 'YYYY-MM' rows are dated the first of their month; rows that
+    already carry a full 'YYYY-MM-DD' date keep the day and have Date cut
+    back to the month, after which MONTHLY_BALANCE is rebuilt. Rows whose
+    Date can't be parsed keep a NULL key and are left out of range queries.
+    """
+    for table in ('INCOME', 'SPEND'):
+        if 'DateKey' not in _table_columns(db, table):
+            db.execute(f"ALTER TABLE {table} ADD COLUMN DateKey INTEGER")
+        db.execute(f"""
+        UPDATE {table} SET
+            DateKey = CAST(strftime('%Y%m%d', CASE WHEN length(Date) = 7 THEN Date || '-01' ELSE Date END) AS INTEGER),
+            Date = substr(Date, 1, 7)
+        WHERE DateKey IS NULL AND date(CASE WHEN length(Date) = 7 THEN Date || '-01' ELSE Date END) IS NOT NULL
+        """)
+    db.execute("CREATE INDEX IF NOT EXISTS idx_spend_datekey_type_amount ON SPEND (DateKey, Type, Amount)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_income_datekey_amount ON INCOME (DateKey, Amount)")
+    db.commit()
+    mark_changed(db, 'INCOME', 'SPEND')
+    # Rows moved from day-level Date values into their month, which leaves
+    # the day-level balance rows behind
+    db.update_data("""
+    DELETE FROM MONTHLY_BALANCE
+    WHERE Month NOT IN (SELECT Date FROM INCOME) AND Month NOT IN (SELECT Date FROM SPEND)
+    """)
+    verify_monthly_balance(db, repair=True)
+
+
+def create_browse_indexes(db):
+    """Indexes that let fetch_page seek straight to a page.
+
+    Each index ends in the implicit rowid, so it is already in the
+    (sort value, rowid) order the pages are read in.
+    """
+    db.execute("CREATE INDEX IF NOT EXISTS idx_income_datekey ON INCOME (DateKey)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_spend_datekey ON SPEND (DateKey)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_spend_type_datekey ON SPEND (Type, DateKey)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_income_amount ON INCOME (Amount)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_spend_amount ON SPEND (Amount)")
+    db.commit()
+
+
+def tune_browse_indexes(db):
+    """Fix the browse indexes for the queries fetch_page really runs.
+
+    The planner reads date-sorted pages through the covering DateKey indexes
+    from add_date_keys, so the plain DateKey ones only slowed writes down.
+    Amount-sorted pages of one category had no index at all and sorted the
+    whole category for every page.
+    """
+    db.execute("DROP INDEX IF EXISTS idx_income_datekey")
+    db.execute("DROP INDEX IF EXISTS idx_spend_datekey")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_spend_type_amount ON SPEND (Type, Amount)")
+    db.commit()
+
+
+def convert_amounts_to_cents(db):
+    """Switch stored amounts from whole dollars to integer cents.
+
+    The update triggers carry the change through to MONTHLY_BALANCE and
+    RUNNING_TOTALS.
+    """
+    db.update_data("UPDATE INCOME SET Amount = Amount * 100")
+    db.update_data("UPDATE SPEND SET Amount = Amount * 100")
+    mark_changed(db, 'INCOME', 'SPEND')
+
+
+# Schema Migrations
+def _migrate_base_tables(db):
+    create_spend_table(db)
+    create_income_table(db)
+    create_monthly_balance_table(db)
+
+
+# Each entry upgrades the schema by one version; the position in the list is
+# the version it produces. Only ever append to this list. migrate() runs each
+# step and its version bump in one transaction.
+MIGRATIONS = [
+    _migrate_base_tables,
+    create_running_totals_table,
+    create_indexes,
+    add_date_keys,
+    convert_amounts_to_cents,
+    create_browse_indexes,
+    create_spend_cube_table,
+    create_forecast_state_table,
+    create_applied_writes_table,
+    key_applied_writes_by_writer,
+    tune_browse_indexes,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(db):
+    return db.get_data("PRAGMA user_version")[0][0]
+
+
+def migrate(db):
+    """Upgrade the database in place to SCHEMA_VERSION.
+
+    The current version is tracked in PRAGMA user_version. Returns the list of
+    versions that were applied.
+    """
+    version = get_schema_version(db)
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(f"Database schema version {version} is newer than this application ({SCHEMA_VERSION}).")
+
+    applied = []
+    for target, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        # Each step commits together with its version bump
+        with db.transaction():
+            migration(db)
+            db.update_data(f"PRAGMA user_version = {target}")
+        applied.append(target)
+    return applied
+
+
+# Amounts
+# Amounts are stored and summed as integer cents; only the UI converts them
+# to dollars for display.
+def to_cents(value):
+    """Parse a dollar amount such as '12.34', '$1,200' or 5 into integer cents.
+
+    Fractions of a cent are rounded half up. Raises ValueError for anything
+    that isn't a number.
+    """
+    text = str(value).strip().replace('$', '').replace(',', '')
+    try:
+        dollars = Decimal(text)
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount {value!r}.") from None
+    if not dollars.is_finite():
+        raise ValueError(f"Invalid amount {value!r}.")
+    return int((dollars * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def format_cents(cents, grouping=True):
+    """Format integer cents as a dollar string, e.g. -123456 -> '-1,234.56'.
+
+    grouping=False leaves out the thousands separators, for machine-readable
+    output.
+    """
+    sign = '-' if cents < 0 else ''
+    dollars, remainder = divmod(abs(cents), 100)
+    return f"{sign}{dollars:{',' if grouping else ''}}.{remainder:02d}"
+
+
+def cents_to_dollars(cents):
+    """Dollar value for charts and other display code."""
+    return cents / 100
+
+
+# Dates
+def parse_date(value):
+    """Parse 'YYYY-MM-DD', or 'YYYY-MM' for the first of the month.
+
+    Returns the (month, date_key) pair stored with a transaction, e.g.
+    ('2024-09', 20240915). Raises ValueError for anything else.
+    """
+    if isinstance(value, date):
+        day = value
+    else:
+        text = str(value).strip()
+        for fmt in ('%Y-%m-%d', '%Y-%m'):
+            try:
+                day = datetime.strptime(text, fmt).date()
+                break
+            except ValueError:
+                continue
+        else:
+            raise ValueError(f"Invalid date {text!r}. Use YYYY-MM-DD or YYYY-MM.")
+    return day.strftime('%Y-%m'), to_date_key(day)
+
+
+def to_date_key(day):
+    return day.year * 10000 + day.month * 100 + day.day
+
+
+def from_date_key(key):
+    return date(key // 10000, key // 100 % 100, key % 100)
+
+
+def _date_key(value):
+    return parse_date(value)[1]
 
 
 # Data Handling Functions
 def add_test_data(db):
     test_income = [
-        ('2024-08', 1000),
-        ('2024-09', 1000),
-        ('2024-09', 1500),
-        ('2024-10', 2000),
-        ('2024-10', 2500),
+        ('2024-08', 20240801, 100000),
+        ('2024-09', 20240901, 100000),
+        ('2024-09', 20240915, 150000),
+        ('2024-10', 20241001, 200000),
+        ('2024-10', 20241015, 250000),
     ]
-    db.insert_data("INSERT INTO INCOME (Date, Amount) VALUES (?, ?)", test_income)
+    db.insert_data(INSERT_INCOME_SQL, test_income)
 
     test_spend = [
-        ('2024-08', 'rent', 2200),
-        ('2024-09', 'groceries', 200),
-        ('2024-09', 'entertainment', 150),
-        ('2024-09', 'utilities', 300),
-        ('2024-10', 'groceries', 250),
-        ('2024-10', 'rent', 1200),
+        ('2024-08', 20240801, 'rent', 220000),
+        ('2024-09', 20240905, 'groceries', 20000),
+        ('2024-09', 20240912, 'entertainment', 15000),
+        ('2024-09', 20240920, 'utilities', 30000),
+        ('2024-10', 20241006, 'groceries', 25000),
+        ('2024-10', 20241001, 'rent', 120000),
     ]
-    db.insert_data("INSERT INTO SPEND (Date, Type, Amount) VALUES (?, ?, ?)", test_spend)
-
-    update_monthly_balance(db, '2024-08')
-    update_monthly_balance(db, '2024-09')
-    update_monthly_balance(db, '2024-10')
+    db.insert_data(INSERT_SPEND_SQL, test_spend)
+    mark_changed(db, 'INCOME', 'SPEND')
 
 
+@cached_query('MONTHLY_BALANCE')
 def get_monthly_balance(db):
     return db.get_data("SELECT * FROM MONTHLY_BALANCE")
 
 
 def update_monthly_balance(db, month):
+    # Full recompute of one month; normal writes are applied by the triggers
     total_income = db.get_data("SELECT IFNULL(SUM(Amount), 0) FROM INCOME WHERE Date = ?", (month,))[0][0]
     total_spending = db.get_data("SELECT IFNULL(SUM(Amount), 0) FROM SPEND WHERE Date = ?", (month,))[0][0]
     balance = total_income - total_spending
     db.update_data("INSERT INTO MONTHLY_BALANCE (Month, Balance) VALUES (?, ?) ON CONFLICT(Month) DO UPDATE SET Balance = ?", 
                    (month, balance, balance))
+    mark_changed(db, 'MONTHLY_BALANCE')
+
+
+def verify_monthly_balance(db, repair=False):
+    """Recompute every monthly balance from scratch and report any drift.
+
+    Returns a list of (month, stored, actual) for each month whose stored
+    balance doesn't match INCOME minus SPEND. With repair=True the table is
+    rebuilt from the recomputed values.
+    """
+    actual = dict(db.get_data("""
+        SELECT Date, SUM(Amount) FROM (
+            SELECT Date, Amount FROM INCOME
+            UNION ALL
+            SELECT Date, -Amount FROM SPEND
+        ) GROUP BY Date
+    """))
+    stored = dict(get_monthly_balance(db))
+
+    drift = []
+    for month in sorted(set(actual) | set(stored)):
+        # A stored zero for a month with no rows is left over from deletes
+        expected = actual.get(month, 0)
+        if month not in stored or stored[month] != expected:
+            drift.append((month, stored.get(month), expected))
+
+    if repair and drift:
+        db.execute("DELETE FROM MONTHLY_BALANCE")
+        db.insert_data("INSERT INTO MONTHLY_BALANCE (Month, Balance) VALUES (?, ?)", sorted(actual.items()))
+        mark_changed(db, 'MONTHLY_BALANCE')
+    return drift
 
 
+@cached_query('SPEND_CUBE')
 def get_monthly_spending(db, month):
-    return db.get_data("SELECT Type, SUM(Amount) FROM SPEND WHERE Date = ? GROUP BY Type", (month,))
+    return db.get_data("SELECT Type, Amount FROM SPEND_CUBE WHERE Month = ?", (month,))
+
+
+@cached_query('SPEND_CUBE')
+def get_spending_months(db):
+    """Every month with spending, oldest first."""
+    return [row[0] for row in db.get_data("SELECT DISTINCT Month FROM SPEND_CUBE ORDER BY Month")]
+
+
+def _month_range(start_month, end_month):
+    where = "Month BETWEEN ? AND ?"
+    return where, [start_month or '', end_month or '9999-99']
+
+
+@cached_query('SPEND_CUBE')
+def get_spending_cube(db, start_month=None, end_month=None):
+    """(month, type, amount) for every cell from start_month to end_month, by month."""
+    where, params = _month_range(start_month, end_month)
+    return db.get_data(f"SELECT Month, Type, Amount FROM SPEND_CUBE WHERE {where} ORDER BY Month, Type", params)
+
+
+@cached_query('SPEND_CUBE')
+def get_top_categories(db, n=5, start_month=None, end_month=None):
+    """The n categories with the most spending over the months, as (type, amount)."""
+    where, params = _month_range(start_month, end_month)
+    return db.get_data(f"""
+        SELECT Type, SUM(Amount) AS Total FROM SPEND_CUBE WHERE {where}
+        GROUP BY Type ORDER BY Total DESC, Type LIMIT ?
+    """, params + [n])
+
+
+def verify_spend_cube(db, repair=False):
+    """Compare SPEND_CUBE with a full GROUP BY over SPEND.
+
+    Returns a list of (month, type, stored, actual) for every cell that
+    differs. With repair=True the cube is rebuilt from SPEND.
+    """
+    actual = {(month, spend_type): amount for month, spend_type, amount in db.get_data(
+        "SELECT Date, Type, SUM(Amount) FROM SPEND GROUP BY Date, Type")}
+    stored = {(month, spend_type): amount for month, spend_type, amount in get_spending_cube.uncached(db)}
+    drift = [key + (stored.get(key), actual.get(key)) for key in sorted(set(actual) | set(stored))
+             if stored.get(key) != actual.get(key)]
+
+    if repair and drift:
+        db.execute("DELETE FROM SPEND_CUBE")
+        db.update_data("""
+        INSERT INTO SPEND_CUBE (Month, Type, Amount, Count)
+        SELECT Date, Type, SUM(Amount), COUNT(*) FROM SPEND GROUP BY Date, Type
+        """)
+        mark_changed(db, 'SPEND_CUBE')
+    return drift
+
+
+@cached_query('SPEND_CUBE')
+def get_spend_categories(db):
+    """Every spending type in use, alphabetically, from the small rollup."""
+    return [row[0] for row in db.get_data("SELECT DISTINCT Type FROM SPEND_CUBE ORDER BY Type")]
 
 
 # Display Functions
@@ -139,27 +900,59 @@ def display_table(data, headers):
         print("No data found.")
 
 
+# Day of a transaction for display, falling back to the raw Date for rows
+# whose date couldn't be migrated
+DISPLAY_DATE_SQL = "CASE WHEN DateKey IS NULL THEN Date ELSE printf('%04d-%02d-%02d', DateKey / 10000, DateKey / 100 % 100, DateKey % 100) END"
+
+
+def _format_last_column(data):
+    # Amounts are always the last column
+    return [row[:-1] + (format_cents(row[-1]),) for row in data]
+
+
 def display_spend_table(db):
-    data = db.get_data("SELECT * FROM SPEND")
-    display_table(data, ["Date", "Type", "Amount"])
+    data = db.get_data(f"SELECT {DISPLAY_DATE_SQL}, Type, Amount FROM SPEND")
+    display_table(_format_last_column(data), ["Date", "Type", "Amount"])
 
 
 def display_income_table(db):
-    data = db.get_data("SELECT * FROM INCOME")
-    display_table(data, ["Date", "Amount"])
+    data = db.get_data(f"SELECT {DISPLAY_DATE_SQL}, Amount FROM INCOME")
+    display_table(_format_last_column(data), ["Date", "Amount"])
 
 
 def display_monthly_balance(db):
-    data = db.get_data("SELECT * FROM MONTHLY_BALANCE")
-    display_table(data, ["Month", "Balance"])
+    data = db.get_data("SELECT Month, Balance FROM MONTHLY_BALANCE")
+    display_table(_format_last_column(data), ["Month", "Balance"])
 
+@cached_query('RUNNING_TOTALS')
 def get_running_balance(db):
-    """Calculate and return the running balance."""
+    """Calculate and return the running balance, in cents."""
     total_income = db.get_total_income()
     total_expenses = db.get_total_expenses()
     return total_income - total_expenses
 
 
+def verify_running_totals(db, repair=False):
+    """Compare RUNNING_TOTALS against the real sums.
+
+    Returns None when they agree, otherwise ((stored income, stored spend),
+    (actual income, actual spend)). With repair=True the stored row is
+    overwritten with the actual sums.
+    """
+    stored = db.get_data("SELECT Income, Spend FROM RUNNING_TOTALS WHERE Id = 1")
+    stored = stored[0] if stored else None
+    actual = db.get_data("""
+        SELECT (SELECT IFNULL(SUM(Amount), 0) FROM INCOME), (SELECT IFNULL(SUM(Amount), 0) FROM SPEND)
+    """)[0]
+    if stored == actual:
+        return None
+
+    if repair:
+        db.update_data("INSERT OR REPLACE INTO RUNNING_TOTALS (Id, Income, Spend) VALUES (1, ?, ?)", actual)
+        mark_changed(db, 'RUNNING_TOTALS')
+    return stored, actual
+
+
 def display_all_tables(db):
     display_income_table(db)
     display_spend_table(db)
@@ -168,24 +961,205 @@ def display_all_tables(db):
 
 def add_spend(db, date, spend_type, amount):
     try:
-        amount = int(amount)
-        db.update_data("INSERT INTO SPEND (Date, Type, Amount) VALUES (?, ?, ?)", (date, spend_type, amount))
-        update_monthly_balance(db, date)
+        month, date_key = parse_date(date)
+    except ValueError as e:
+        print(e)
+        return
+    try:
+        amount = to_cents(amount)
+        db.update_data(INSERT_SPEND_SQL, (month, date_key, spend_type, amount))
+        mark_changed(db, 'SPEND')
     except ValueError:
         print("Invalid amount. Please provide a numeric value.")
 
 def add_income(db, date, amount):
     try:
-        amount = int(amount)
-        db.update_data("INSERT INTO INCOME (Date, Amount) VALUES (?, ?)", (date, amount))
-        update_monthly_balance(db, date)
+        month, date_key = parse_date(date)
+    except ValueError as e:
+        print(e)
+        return
+    try:
+        amount = to_cents(amount)
+        db.update_data(INSERT_INCOME_SQL, (month, date_key, amount))
+        mark_changed(db, 'INCOME')
     except ValueError:
         print("Invalid amount. Please provide a numeric value.")
 
+@cached_query('INCOME')
 def get_monthly_income(db):
     # Get total income for each month (assuming the "Date" column format is "YYYY-MM")
     return db.get_data("SELECT Date, SUM(Amount) FROM INCOME GROUP BY Date")
 
+def iter_monthly_summary(db, start_month=None, end_month=None):
+    """Yield (month, income, spending, balance) in cents for each month.
+
+    Rows are streamed from the cursor rather than fetched all at once.
+    """
+    cursor = db.connection.execute("""
+        SELECT b.Month,
+               (SELECT IFNULL(SUM(Amount), 0) FROM INCOME WHERE Date = b.Month),
+               (SELECT IFNULL(SUM(Amount), 0) FROM SPEND WHERE Date = b.Month),
+               b.Balance
+        FROM MONTHLY_BALANCE b
+        WHERE b.Month BETWEEN ? AND ?
+        ORDER BY b.Month
+    """, (start_month or '0000-00', end_month or '9999-99'))
+    yield from cursor
+
+
+# Range Aggregation
+# SQL expressions that turn a DateKey into a bucket label
+BUCKETS = {
+    'day': "printf('%04d-%02d-%02d', DateKey / 10000, DateKey / 100 % 100, DateKey % 100)",
+    # Weeks are labelled by the Monday they start on
+    'week': "date(printf('%04d-%02d-%02d', DateKey / 10000, DateKey / 100 % 100, DateKey % 100), '-6 days', 'weekday 1')",
+    'month': "printf('%04d-%02d', DateKey / 10000, DateKey / 100 % 100)",
+    'quarter': "printf('%04d-Q%d', DateKey / 10000, (DateKey / 100 % 100 + 2) / 3)",
+    'year': "printf('%04d', DateKey / 10000)",
+}
+
+
+def _range_filter(table, start, end, category):
+    if table not in ('INCOME', 'SPEND'):
+        raise ValueError(f"Unknown table {table!r}")
+    where = "DateKey BETWEEN ? AND ?"
+    params = [_date_key(start), _date_key(end)]
+    if category is not None:
+        if table != 'SPEND':
+            raise ValueError("Only SPEND has categories")
+        where += " AND Type = ?"
+        params.append(category)
+    return where, params
+
+
+@cached_query('INCOME', 'SPEND')
+def get_total_between(db, table, start, end, category=None):
+    """Sum of table's amounts from start to end, both days included."""
+    where, params = _range_filter(table, start, end, category)
+    return db.get_data(f"SELECT IFNULL(SUM(Amount), 0) FROM {table} WHERE {where}", params)[0][0]
+
+
+@cached_query('INCOME', 'SPEND')
+def get_balance_between(db, start, end):
+    """Income minus spending from start to end, both days included."""
+    return get_total_between(db, 'INCOME', start, end) - get_total_between(db, 'SPEND', start, end)
+
+
+@cached_query('INCOME', 'SPEND')
+def get_bucketed_totals(db, table, start, end, bucket='month', category=None):
+    """Totals of table between start and end grouped into day, week, month,
+    quarter or year buckets, as a list of (label, total) in date order.
+
+    The rows come from one range scan of the DateKey index.
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f"Unknown bucket {bucket!r}; use one of {', '.join(BUCKETS)}")
+    where, params = _range_filter(table, start, end, category)
+    return db.get_data(f"""
+        SELECT {BUCKETS[bucket]} AS Bucket, SUM(Amount) FROM {table}
+        WHERE {where} GROUP BY Bucket ORDER BY Bucket
+    """, params)
+
+
+@cached_query('INCOME', 'SPEND')
+def get_rolling_totals(db, table, start, end, window=30, category=None):
+    """Trailing `window`-day totals of table for every day from start to end.
+
+    Returns a list of (YYYY-MM-DD, total). Daily sums are read with one range
+    scan covering the first window too, then slid across in Python.
+    """
+    first, last = from_date_key(_date_key(start)), from_date_key(_date_key(end))
+    scan_start = first - timedelta(days=window - 1)
+    daily = dict(get_bucketed_totals(db, table, scan_start, last, 'day', category))
+
+    totals = []
+    running = 0
+    day = scan_start
+    while day <= last:
+        running += daily.get(day.isoformat(), 0)
+        dropped = day - timedelta(days=window)
+        if dropped >= scan_start:
+            running -= daily.get(dropped.isoformat(), 0)
+        if day >= first:
+            totals.append((day.isoformat(), running))
+        day += timedelta(days=1)
+    return totals
+
+
+# Transaction Browsing
+# Sort orders for fetch_page; ties are broken by kind, then rowid
+BROWSE_SORTS = {
+    'date': 'DateKey',
+    'amount': 'Amount',
+}
+
+# (kind, table, type column) for each source of transactions
+BROWSE_SOURCES = (
+    ('income', 'INCOME', 'NULL'),
+    ('spend', 'SPEND', 'Type'),
+)
+
+PAGE_SIZE = 200
+
+
+def fetch_page(db, table=None, after=None, limit=PAGE_SIZE, sort='date', descending=False, category=None,
+               month=None):
+    """Read one page of transactions using keyset pagination.
+
+    Rows are (kind, id, date_key, type, amount) with kind 'income' or
+    'spend' and id the rowid. table limits the page to 'INCOME' or 'SPEND'
+    and a category implies SPEND. after is the page_key() of the last row
+    already shown. The next page starts with a seek on an index, so any page
+    costs the same however deep it is. Rows without a day key are left out,
+    as in the range queries.
+    """
+    if sort not in BROWSE_SORTS:
+        raise ValueError(f"Unknown sort {sort!r}; use one of {', '.join(BROWSE_SORTS)}")
+    if table not in (None, 'INCOME', 'SPEND'):
+        raise ValueError(f"Unknown table {table!r}")
+    column = BROWSE_SORTS[sort]
+    op, direction = ('<', 'DESC') if descending else ('>', 'ASC')
+
+    arms = []
+    params = []
+    for kind, name, type_column in BROWSE_SOURCES:
+        if table not in (None, name) or (category is not None and name != 'SPEND'):
+            continue
+        where = ["DateKey IS NOT NULL"]
+        if category is not None:
+            where.append("Type = ?")
+            params.append(category)
+        if month is not None:
+            first = _date_key(month) // 100 * 100
+            where.append("DateKey BETWEEN ? AND ?")
+            params += [first, first + 99]
+        if after is not None:
+            value, after_kind, after_id = after
+            if kind == after_kind:
+                where.append(f"({column}, rowid) {op} (?, ?)")
+                params += [value, after_id]
+            elif (kind > after_kind) != descending:
+                # This kind sorts after the last row's kind, so ties are still to come
+                where.append(f"{column} {op}= ?")
+                params.append(value)
+            else:
+                where.append(f"{column} {op} ?")
+                params.append(value)
+        arms.append(f"SELECT '{kind}' AS Kind, rowid AS Id, DateKey, {type_column} AS Type, Amount "
+                    f"FROM {name} WHERE {' AND '.join(where)}")
+    if not arms:
+        return []
+
+    sql = " UNION ALL ".join(arms) + f" ORDER BY {column} {direction}, Kind {direction}, Id {direction} LIMIT ?"
+    return db.get_data(sql, params + [limit])
+
+
+def page_key(row, sort='date'):
+    """The keyset position of a fetch_page row, to pass back as after."""
+    kind, row_id, date_key, _, amount = row
+    return (date_key if sort == 'date' else amount, kind, row_id)
+
+
 def get_and_plot_monthly_spending(db, month):
     spending_data = get_monthly_spending(db, month)
     if spending_data:
@@ -200,22 +1174,26 @@ def get_and_plot_monthly_spending(db, month):
 def main():
     db = Database()
 
-    # Create necessary tables
-    create_spend_table(db)
-    create_income_table(db)
-    create_monthly_balance_table(db)
+    # Create or upgrade the schema
+    migrate(db)
 
-    # Add test data
-    add_test_data(db)
+    # Add test data to an empty database only
+    if not db.get_data("SELECT 1 FROM INCOME LIMIT 1") and not db.get_data("SELECT 1 FROM SPEND LIMIT 1"):
+        add_test_data(db)
 
     # User Interaction (Console-based)
     while True:
-        choice = input("\nPlease choose one: Add Income, Add Spend, Display Tables, Plot Spending, Quit: ").lower()
+        choice = input("\nPlease choose one: Add Income, Add Spend, Display Tables, Plot Spending, Verify Balances, Quit: ").lower()
 
         if choice == 'add income':
-            add_income(db)
+            date = input("Enter the date (YYYY-MM-DD or YYYY-MM): ")
+            amount = input("Enter the amount: ")
+            add_income(db, date, amount)
         elif choice == 'add spend':
-            add_spend(db)
+            date = input("Enter the date (YYYY-MM-DD or YYYY-MM): ")
+            spend_type = input("Enter the expense type: ")
+            amount = input("Enter the amount: ")
+            add_spend(db, date, spend_type, amount)
         elif choice == 'display tables':
             display_all_tables(db)
         elif choice == 'plot spending':
@@ -224,6 +1202,24 @@ def main():
                 get_and_plot_monthly_spending(db, month)
             else:
                 print("Invalid month format. Please enter in YYYY-MM format.")
+        elif choice == 'verify balances':
+            drift = verify_monthly_balance(db, repair=True)
+            if drift:
+                display_table(drift, ["Month", "Stored", "Actual"])
+                print(f"Repaired {len(drift)} month(s).")
+            else:
+                print("Monthly balances are consistent.")
+            totals_drift = verify_running_totals(db, repair=True)
+            if totals_drift:
+                print(f"Repaired running totals: stored {totals_drift[0]}, actual {totals_drift[1]}.")
+            else:
+                print("Running totals are consistent.")
+            cube_drift = verify_spend_cube(db, repair=True)
+            if cube_drift:
+                display_table(cube_drift, ["Month", "Type", "Stored", "Actual"])
+                print(f"Repaired {len(cube_drift)} spending cell(s).")
+            else:
+                print("Spending rollup is consistent.")
         elif choice == 'quit':
             db.close()
             break
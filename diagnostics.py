@@ -0,0 +1,187 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Latency samples kept per statement for the percentiles
+SAMPLES = 1000
+
+# Statements that EXPLAIN QUERY PLAN can describe
+_EXPLAINABLE = re.compile(r'^\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\b', re.I)
+
+# String and number literals, which the trace callback sees already bound
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def normalize_sql(sql):
+    """Collapse whitespace so the same statement always gets the same key."""
+    return ' '.join(sql.split())
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class StatementStats:
+    """Counts and latencies for one statement or named span."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.samples = deque(maxlen=SAMPLES)
+
+    def add(self, ms, rows):
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.rows += rows
+        self.samples.append(ms)
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        return {
+            'count': self.count,
+            'total_ms': self.total_ms,
+            'mean_ms': self.total_ms / self.count if self.count else 0.0,
+            'p50_ms': percentile(ordered, 50),
+            'p95_ms': percentile(ordered, 95),
+            'p99_ms': percentile(ordered, 99),
+            'max_ms': self.max_ms,
+            'rows': self.rows,
+        }
+
+
+class QueryStats:
+    """Process-wide statement timings, trace counts and a slow-query log.
+
+    Disabled by default. Database checks `enabled` before timing anything,
+    so while it is off the only cost is that one attribute test per call.
+    Enabled, every statement run through Database is timed with its row
+    count, statements slower than slow_ms are logged with their EXPLAIN
+    QUERY PLAN, and connections opened while enabled also count every
+    statement SQLite runs (including those inside triggers) through a trace
+    callback. Named spans time non-SQL work such as chart redraws.
+    """
+
+    def __init__(self, enabled=False, slow_ms=50.0, slow_log_size=100):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self._lock = threading.Lock()
+        self._statements = {}
+        self._spans = {}
+        self._traced = {}
+        self.slow_log = deque(maxlen=slow_log_size)
+
+    def enable(self, slow_ms=None):
+        if slow_ms is not None:
+            self.slow_ms = slow_ms
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self._spans.clear()
+            self._traced.clear()
+            self.slow_log.clear()
+
+    def record(self, connection, sql, params, seconds, rows):
+        """Add one timed statement; logs it with its plan if it was slow."""
+        ms = seconds * 1000
+        key = normalize_sql(sql)
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is None:
+                stats = self._statements[key] = StatementStats()
+            stats.add(ms, rows)
+        if ms >= self.slow_ms:
+            self._log_slow(connection, sql, key, params, ms, rows)
+
+    def _log_slow(self, connection, sql, key, params, ms, rows):
+        plan = None
+        if _EXPLAINABLE.match(sql):
+            try:
+                plan = [row[-1] for row in connection.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+            except Exception as e:  # The plan is best effort; never break the real query
+                plan = [f"unavailable: {e}"]
+        with self._lock:
+            self.slow_log.append({
+                'time': time.time(),
+                'sql': key,
+                'params': repr(params)[:200],
+                'ms': ms,
+                'rows': rows,
+                'plan': plan,
+            })
+
+    def trace(self, statement):
+        """sqlite3 trace callback: count every statement SQLite executes.
+
+        SQLite reports a statement again for each trigger program it runs,
+        so a write counts once per trigger it fires.
+        """
+        key = _LITERALS.sub('?', normalize_sql(statement))[:200]
+        with self._lock:
+            self._traced[key] = self._traced.get(key, 0) + 1
+
+    @contextmanager
+    def span(self, name):
+        """Time a block of non-SQL work under name. Free when disabled."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                stats = self._spans.get(name)
+                if stats is None:
+                    stats = self._spans[name] = StatementStats()
+                stats.add(ms, 0)
+
+    def snapshot(self):
+        """Everything recorded so far as plain data, slowest total first."""
+        with self._lock:
+            statements = {sql: stats.summary() for sql, stats in self._statements.items()}
+            spans = {name: stats.summary() for name, stats in self._spans.items()}
+            traced = dict(self._traced)
+            slow = list(self.slow_log)
+
+        def by_total(items):
+            return dict(sorted(items.items(), key=lambda item: -item[1]['total_ms']))
+        return {
+            'enabled': self.enabled,
+            'slow_ms': self.slow_ms,
+            'statements': by_total(statements),
+            'spans': by_total(spans),
+            'traced': dict(sorted(traced.items(), key=lambda item: -item[1])),
+            'slow_log': slow,
+        }
+
+    def dump(self, path):
+        """Write snapshot() to path as JSON."""
+        temp = path + '.tmp'
+        with open(temp, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(temp, path)
+
+
+# Shared by every Database in the process. FINANCE_DIAGNOSTICS=1 turns it on
+# from the start; FINANCE_SLOW_MS sets the slow-query threshold.
+query_stats = QueryStats(
+    enabled=os.environ.get('FINANCE_DIAGNOSTICS') == '1',
+    slow_ms=float(os.environ.get('FINANCE_SLOW_MS', 50)),
+)
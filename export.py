@@ -0,0 +1,151 @@
+import csv
+import json
+import os
+import sys
+from array import array
+
+import database
+
+# What gets exported from each table. CSV rows carry a readable date and
+# dollar amount; the columnar export keeps the stored integers. Columns are
+# 'int' (int64) or 'str' (dictionary encoded). Day keys that couldn't be
+# migrated are exported as 0.
+EXPORTS = {
+    'INCOME': {
+        'csv_sql': f"SELECT {database.DISPLAY_DATE_SQL}, Amount FROM INCOME ORDER BY rowid",
+        'csv_header': ['date', 'amount'],
+        'order_by': 'rowid',
+        'columns': [('DateKey', 'int'), ('Amount', 'int')],
+    },
+    'SPEND': {
+        'csv_sql': f"SELECT {database.DISPLAY_DATE_SQL}, Type, Amount FROM SPEND ORDER BY rowid",
+        'csv_header': ['date', 'type', 'amount'],
+        'order_by': 'rowid',
+        'columns': [('DateKey', 'int'), ('Type', 'str'), ('Amount', 'int')],
+    },
+    'MONTHLY_BALANCE': {
+        'csv_sql': "SELECT Month, Balance FROM MONTHLY_BALANCE ORDER BY Month",
+        'csv_header': ['month', 'balance'],
+        'order_by': 'Month',
+        'columns': [('Month', 'str'), ('Balance', 'int')],
+    },
+}
+
+CHUNK_SIZE = 10000
+
+# Bumped whenever the layout of the columnar files changes
+COLUMNAR_VERSION = 1
+
+# Value and dictionary-code types in the columnar files
+INT_DTYPE = f"<i{array('q').itemsize}"
+CODE_DTYPE = f"<i{array('i').itemsize}"
+
+
+def _spec(table):
+    if table not in EXPORTS:
+        raise ValueError(f"Unknown table {table!r}; use one of {', '.join(EXPORTS)}")
+    return EXPORTS[table]
+
+
+def export_csv(db, table, path, chunk_size=CHUNK_SIZE):
+    """Stream table to a CSV file one chunk at a time. Returns the row count."""
+    spec = _spec(table)
+    count = 0
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(spec['csv_header'])
+        for rows in db.iter_chunks(spec['csv_sql'], chunk_size=chunk_size):
+            # Amounts are always the last column
+            writer.writerows(row[:-1] + (database.format_cents(row[-1], grouping=False),) for row in rows)
+            count += len(rows)
+    return count
+
+
+def _write_array(f, typecode, values):
+    data = array(typecode, values)
+    # The files are always little-endian so they load the same everywhere
+    if sys.byteorder == 'big':
+        data.byteswap()
+    data.tofile(f)
+
+
+def export_columnar(db, table, directory, chunk_size=CHUNK_SIZE):
+    """Stream table into one raw binary file per column plus a JSON manifest.
+
+    Integer columns are little-endian int64; string columns are stored as
+    integer codes into a dictionary kept in the manifest, which only grows
+    with the number of distinct values. Each file can be read back with
+    numpy.fromfile (see load_columnar). Returns the row count.
+    """
+    spec = _spec(table)
+    columns = spec['columns']
+    select = ', '.join(f"IFNULL({name}, 0)" if kind == 'int' else name for name, kind in columns)
+    sql = f"SELECT {select} FROM {table} ORDER BY {spec['order_by']}"
+
+    os.makedirs(directory, exist_ok=True)
+    files = [f"{table}.{name}.bin" for name, _ in columns]
+    dictionaries = [{} if kind == 'str' else None for _, kind in columns]
+    handles = [open(os.path.join(directory, name), 'wb') for name in files]
+    count = 0
+    try:
+        for rows in db.iter_chunks(sql, chunk_size=chunk_size):
+            for i, values in enumerate(zip(*rows)):
+                codes = dictionaries[i]
+                if codes is None:
+                    _write_array(handles[i], 'q', values)
+                else:
+                    _write_array(handles[i], 'i', (codes.setdefault(v, len(codes)) for v in values))
+            count += len(rows)
+    finally:
+        for handle in handles:
+            handle.close()
+
+    manifest = {
+        'version': COLUMNAR_VERSION,
+        'table': table,
+        'rows': count,
+        'columns': [],
+    }
+    for (name, _), file, codes in zip(columns, files, dictionaries):
+        column = {'name': name, 'file': file, 'dtype': INT_DTYPE if codes is None else CODE_DTYPE}
+        if codes is not None:
+            column['dictionary'] = list(codes)
+        manifest['columns'].append(column)
+    with open(os.path.join(directory, f"{table}.json"), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return count
+
+
+def load_columnar(directory, table, decode=True):
+    """Load a columnar export into a dict of NumPy arrays keyed by column.
+
+    String columns come back decoded unless decode is False, in which case
+    they are the integer codes and the dictionaries are in the manifest.
+    """
+    import numpy as np
+
+    with open(os.path.join(directory, f"{table}.json")) as f:
+        manifest = json.load(f)
+    if manifest.get('version') != COLUMNAR_VERSION:
+        raise ValueError(f"Unsupported columnar export version {manifest.get('version')!r}")
+
+    arrays = {}
+    for column in manifest['columns']:
+        values = np.fromfile(os.path.join(directory, column['file']), dtype=column['dtype'])
+        if decode and 'dictionary' in column:
+            values = np.array(column['dictionary'], dtype=str)[values] if len(values) else np.array([], dtype=str)
+        arrays[column['name']] = values
+    return arrays
+
+
+def export_tables(db, directory, tables=tuple(EXPORTS), fmt='csv', chunk_size=CHUNK_SIZE):
+    """Export several tables into directory. Yields (table, rows, path) as each finishes."""
+    os.makedirs(directory, exist_ok=True)
+    for table in tables:
+        if fmt == 'csv':
+            path = os.path.join(directory, f"{table}.csv")
+            yield table, export_csv(db, table, path, chunk_size), path
+        elif fmt == 'columnar':
+            yield table, export_columnar(db, table, directory, chunk_size), os.path.join(directory, f"{table}.json")
+        else:
+            raise ValueError(f"Unknown export format {fmt!r}")
@@ -0,0 +1,225 @@
+import math
+from collections import namedtuple
+from datetime import date
+
+# Damped Holt (additive trend) smoothing, one model per series: income and
+# each spending category. The constants are fixed rather than fitted, so a
+# finished month folds into a series with a handful of arithmetic steps and
+# the state never has to be refit from the whole history.
+ALPHA = 0.3  # Level
+BETA = 0.1  # Trend
+PHI = 0.9  # Trend damping, so long horizons level off instead of running away
+
+DEFAULT_HORIZON = 12
+HORIZONS = (6, 12, 18, 24)
+
+# Half-widths of the central 80% and 95% bands, in standard deviations
+Z_80 = 1.2816
+Z_95 = 1.96
+
+INCOME_SERIES = 'INCOME'
+SPEND_PREFIX = 'SPEND:'
+
+# Months are 'YYYY-MM'; this range keeps unparseable Date values out
+_VALID_MONTHS = "BETWEEN '0000-01' AND '9999-12'"
+
+# Smoothing state of one series after folding in month. sse and count
+# accumulate the squared one-step-ahead errors.
+SeriesState = namedtuple('SeriesState', ['month', 'level', 'trend', 'sse', 'count'])
+
+# forecast() result: per-month lists over months, in cents. categories maps
+# each spending category to its own list; net_sd is the standard deviation
+# of the net amount.
+Forecast = namedtuple('Forecast', ['months', 'income', 'spending', 'categories', 'net', 'net_sd'])
+
+
+def next_month(month, step=1):
+    year, number = divmod(int(month[:4]) * 12 + int(month[5:7]) - 1 + step, 12)
+    return f"{year:04d}-{number + 1:02d}"
+
+
+def fold(state, month, value):
+    """Fold one month's total into a series; state is None for a new series."""
+    if state is None:
+        return SeriesState(month, float(value), 0.0, 0.0, 0)
+    predicted = state.level + PHI * state.trend
+    error = value - predicted
+    return SeriesState(
+        month,
+        predicted + ALPHA * error,
+        PHI * state.trend + ALPHA * BETA * error,
+        state.sse + error * error,
+        state.count + 1,
+    )
+
+
+def project(state, steps):
+    """(mean, variance) for each of the next steps months after state.month.
+
+    The variance is the usual one for damped additive-trend smoothing,
+    sigma^2 * (1 + sum over j < h of (alpha * (1 + beta * phi_j))^2) with
+    phi_j = phi + ... + phi^j. Until the series has a one-step error to go
+    on, sigma is taken to be the level itself. Means are floored at zero
+    since amounts are never negative.
+    """
+    variance = state.sse / state.count if state.count else state.level ** 2
+    results = []
+    damping = 0.0
+    spread = 0.0
+    for h in range(1, steps + 1):
+        if h > 1:
+            # phi_j for j = h - 1
+            spread += (ALPHA * (1 + BETA * damping)) ** 2
+        damping += PHI ** h
+        results.append((max(0.0, state.level + damping * state.trend), variance * (1 + spread)))
+    return results
+
+
+def _latest_month(db):
+    """The latest month with data, not counting any after the current month.
+
+    Future-dated rows would otherwise have every series fold in months of
+    zeros up to them. Months whose rows were all deleted keep a zero
+    balance row, so only non-zero balances count.
+    """
+    return db.get_data(
+        f"SELECT MAX(Month) FROM MONTHLY_BALANCE WHERE Month {_VALID_MONTHS} AND Month <= ? AND Balance != 0",
+        (date.today().strftime('%Y-%m'),))[0][0]
+
+
+def first_forecast_month(db):
+    """The month forecast() starts at by default; None without any data."""
+    latest = _latest_month(db)
+    return next_month(latest) if latest else None
+
+
+def load_states(db, before):
+    """Every series' state, leaving out any that reach month before or later.
+
+    Those can only be left over from rows that were deleted since.
+    """
+    return {row[0]: SeriesState(*row[1:]) for row in db.get_data(
+        "SELECT Series, Month, Level, Trend, SSE, Count FROM FORECAST_STATE WHERE Month < ?", (before,))}
+
+
+def update_forecast(db):
+    """Fold every finished month not yet in FORECAST_STATE into its series.
+
+    The latest month with any data may still be filling up, so only the
+    months before it count as finished. Normally that means nothing to do,
+    or one month per series when a new month starts. A series whose state
+    was dropped by a backdated write is refit from its first month. Returns
+    the number of (series, month) steps applied.
+    """
+    latest = _latest_month(db)
+    if latest is None:
+        return 0
+    states = load_states(db, latest)
+
+    # Where each series starts: the month after its state, or its first month
+    first_months = {SPEND_PREFIX + spend_type: month for spend_type, month in db.get_data(
+        f"SELECT Type, MIN(Month) FROM SPEND_CUBE WHERE Month {_VALID_MONTHS} AND Month < ? GROUP BY Type",
+        (latest,))}
+    first_income = db.get_data(f"SELECT MIN(Date) FROM INCOME WHERE Date {_VALID_MONTHS} AND Date < ?",
+                               (latest,))[0][0]
+    if first_income:
+        first_months[INCOME_SERIES] = first_income
+    starts = {series: next_month(states[series].month) if series in states else month
+              for series, month in first_months.items()}
+    starts = {series: month for series, month in starts.items() if month < latest}
+    if not starts:
+        return 0
+
+    # Totals for the finished months still to fold, from the rollups
+    start = min(starts.values())
+    totals = {(SPEND_PREFIX + spend_type, month): amount for month, spend_type, amount in db.get_data(
+        "SELECT Month, Type, Amount FROM SPEND_CUBE WHERE Month >= ? AND Month < ?", (start, latest))}
+    totals.update(((INCOME_SERIES, month), amount) for month, amount in db.get_data(
+        "SELECT Date, SUM(Amount) FROM INCOME WHERE Date >= ? AND Date < ? GROUP BY Date", (start, latest)))
+
+    steps = 0
+    for series, month in starts.items():
+        state = states.get(series)
+        while month < latest:
+            state = fold(state, month, totals.get((series, month), 0))
+            month = next_month(month)
+            steps += 1
+        states[series] = state
+
+    with db.transaction():
+        db.insert_data(
+            "INSERT OR REPLACE INTO FORECAST_STATE (Series, Month, Level, Trend, SSE, Count) VALUES (?, ?, ?, ?, ?, ?)",
+            [(series,) + tuple(states[series]) for series in starts],
+        )
+    return steps
+
+
+def forecast(db, horizon=DEFAULT_HORIZON, start=None):
+    """Project income, spending by category and the net amount.
+
+    Covers exactly horizon months from start, which defaults to the month
+    after the latest one with data. That month keeps its recorded amounts
+    and is never replaced by a projection, even while still incomplete. A
+    later start lines this ledger up with others for combine(). Only the persisted
+    state is read, after update_forecast brings it up to date. Series are
+    treated as independent, so the net variance is the sum of theirs.
+    """
+    update_forecast(db)
+    latest = _latest_month(db)
+    states = load_states(db, latest) if latest else {}
+    if not states:
+        return Forecast([], [], [], {}, [], [])
+    start = max(start or next_month(latest), next_month(latest))
+
+    months = [next_month(start, k) for k in range(horizon)]
+    income = [0.0] * len(months)
+    spending = [0.0] * len(months)
+    variance = [0.0] * len(months)
+    categories = {}
+    for series, state in sorted(states.items()):
+        # Months from the end of the state to start; usually two, as the
+        # state stops before the latest month, more for a series that
+        # stopped or when start is further ahead
+        offset = (int(start[:4]) - int(state.month[:4])) * 12 + int(start[5:7]) - int(state.month[5:7])
+        projected = project(state, offset + horizon - 1)[offset - 1:]
+        means = [mean for mean, _ in projected]
+        if series == INCOME_SERIES:
+            income = means
+        else:
+            categories[series[len(SPEND_PREFIX):]] = means
+            spending = [total + mean for total, mean in zip(spending, means)]
+        variance = [total + var for total, (_, var) in zip(variance, projected)]
+
+    net = [i - s for i, s in zip(income, spending)]
+    return Forecast(months, income, spending, categories, net, [math.sqrt(v) for v in variance])
+
+
+def combine(forecasts):
+    """Sum forecasts of several accounts, treated as independent.
+
+    Pass forecasts made with the same start so their months line up.
+    """
+    forecasts = [f for f in forecasts if f.months]
+    if not forecasts:
+        return Forecast([], [], [], {}, [], [])
+    months = sorted(set().union(*(f.months for f in forecasts)))
+    index = {month: i for i, month in enumerate(months)}
+
+    def total(series_of):
+        values = [0.0] * len(months)
+        for f in forecasts:
+            for month, value in zip(f.months, series_of(f)):
+                values[index[month]] += value
+        return values
+
+    names = sorted(set().union(*(f.categories for f in forecasts)))
+    categories = {name: total(lambda f: f.categories.get(name, [0.0] * len(f.months))) for name in names}
+    variance = total(lambda f: [sd * sd for sd in f.net_sd])
+    return Forecast(months, total(lambda f: f.income), total(lambda f: f.spending), categories,
+                    total(lambda f: f.net), [math.sqrt(v) for v in variance])
+
+
+def bands(result, z=Z_80):
+    """(low, high) lists around result.net, z standard deviations wide."""
+    return ([net - z * sd for net, sd in zip(result.net, result.net_sd)],
+            [net + z * sd for net, sd in zip(result.net, result.net_sd)])
@@ -0,0 +1,211 @@
+import csv
+import os
+import re
+from collections import namedtuple
+from datetime import datetime
+
+import database
+
+# A single parsed statement line. spend_type is None for income; amount is
+# in cents.
+Transaction = namedtuple('Transaction', ['date', 'spend_type', 'amount'])
+
+DEFAULT_CATEGORY = 'uncategorized'
+
+DATE_FORMATS = ('%Y-%m-%d', '%Y-%m', '%m/%d/%Y', '%m/%d/%y', '%d.%m.%Y', '%Y%m%d')
+
+
+def normalize_date(text):
+    """Convert a statement date into 'YYYY-MM-DD'."""
+    text = text.strip()
+    # OFX dates look like 20240915120000[-5:EST]; only the day part matters
+    if re.match(r'^\d{8}', text):
+        text = text[:8]
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized date: {text!r}")
+
+
+def parse_amount(text):
+    """Parse a statement amount such as '$1,234.50' or '(20.00)' into cents."""
+    text = text.strip()
+    if text.startswith('(') and text.endswith(')'):
+        text = '-' + text[1:-1]
+    return database.to_cents(text)
+
+
+def _make_transaction(date, amount, category):
+    """Positive amounts are income, negative amounts are spending."""
+    day = normalize_date(date)
+    if amount >= 0:
+        return Transaction(day, None, amount)
+    return Transaction(day, (category or DEFAULT_CATEGORY).strip().lower(), -amount)
+
+
+def _find_column(fieldnames, candidates):
+    lookup = {name.strip().lower(): name for name in fieldnames}
+    for candidate in candidates:
+        if candidate in lookup:
+            return lookup[candidate]
+    return None
+
+
+def read_csv(path):
+    """Stream transactions from a bank CSV export.
+
+    The file needs a date column and either a signed amount column or separate
+    debit/credit columns. A category or description column is used as the
+    spending type when present. A row with fewer fields than the header
+    raises ValueError naming its line.
+    """
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        fields = reader.fieldnames or []
+        date_col = _find_column(fields, ('date', 'posted date', 'transaction date', 'posting date'))
+        amount_col = _find_column(fields, ('amount', 'transaction amount'))
+        debit_col = _find_column(fields, ('debit', 'withdrawal'))
+        credit_col = _find_column(fields, ('credit', 'deposit'))
+        category_col = _find_column(fields, ('category', 'type', 'description', 'memo', 'payee'))
+
+        if date_col is None or (amount_col is None and debit_col is None and credit_col is None):
+            raise ValueError(f"{path}: CSV needs a date column and an amount or debit/credit column.")
+
+        for row in reader:
+            if not (row.get(date_col) or '').strip():
+                continue
+            if None in row.values():
+                raise ValueError(f"{path}: line {reader.line_num} has fewer fields than the header.")
+            if amount_col is not None:
+                amount = parse_amount(row[amount_col])
+            else:
+                credit = (row.get(credit_col) or '').strip() if credit_col else ''
+                debit = (row.get(debit_col) or '').strip() if debit_col else ''
+                amount = (parse_amount(credit) if credit else 0) - (abs(parse_amount(debit)) if debit else 0)
+            category = row.get(category_col) if category_col else None
+            yield _make_transaction(row[date_col], amount, category)
+
+
+def read_qif(path):
+    """Stream transactions from a QIF file (D, T/U, L and P fields)."""
+    date = amount = category = payee = None
+    with open(path, encoding='utf-8-sig') as f:
+        for line in f:
+            line = line.rstrip('\r\n')
+            if not line or line.startswith('!'):
+                continue
+            code, value = line[0], line[1:]
+            if code == 'D':
+                # QIF uses 9/15'24 or 9/15/2024
+                date = value.replace("'", '/').replace(' ', '0')
+            elif code in ('T', 'U'):
+                amount = parse_amount(value)
+            elif code == 'L':
+                category = value.split(':')[0]
+            elif code == 'P':
+                payee = value
+            elif code == '^':
+                if date is not None and amount is not None:
+                    yield _make_transaction(date, amount, category or payee)
+                date = amount = category = payee = None
+
+
+_OFX_TRANSACTION = re.compile(r'<STMTTRN>(.*?)(?:</STMTTRN>|(?=<STMTTRN>)|(?=</BANKTRANLIST>)|\Z)', re.S | re.I)
+_OFX_FIELD = r'<{}>([^<\r\n]*)'
+
+
+def read_ofx(path):
+    """Stream transactions from the STMTTRN blocks of an OFX file."""
+    with open(path, encoding='utf-8-sig', errors='replace') as f:
+        buffer = ''
+        for chunk in iter(lambda: f.read(64 * 1024), ''):
+            buffer += chunk
+            # Only parse blocks that are known to be complete
+            end = buffer.upper().rfind('<STMTTRN>')
+            complete, buffer = (buffer[:end], buffer[end:]) if end > 0 else ('', buffer)
+            yield from _parse_ofx_blocks(complete)
+        yield from _parse_ofx_blocks(buffer)
+
+
+def _parse_ofx_blocks(text):
+    for match in _OFX_TRANSACTION.finditer(text):
+        block = match.group(1)
+        fields = {}
+        for name in ('DTPOSTED', 'TRNAMT', 'NAME', 'MEMO'):
+            found = re.search(_OFX_FIELD.format(name), block, re.I)
+            if found:
+                fields[name] = found.group(1).strip()
+        if 'DTPOSTED' in fields and 'TRNAMT' in fields:
+            yield _make_transaction(fields['DTPOSTED'], parse_amount(fields['TRNAMT']),
+                                    fields.get('NAME') or fields.get('MEMO'))
+
+
+READERS = {
+    '.csv': read_csv,
+    '.qif': read_qif,
+    '.ofx': read_ofx,
+    '.qfx': read_ofx,
+}
+
+
+def read_statement(path):
+    """Pick a reader based on the file extension."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in READERS:
+        raise ValueError(f"Unsupported statement format: {ext or path}")
+    return READERS[ext](path)
+
+
+def read_statements(paths):
+    for path in paths:
+        yield from read_statement(path)
+
+
+def import_transactions(db, transactions, chunk_size=1000, progress=None):
+    """Insert a stream of transactions in chunks, one transaction per chunk.
+
+    MONTHLY_BALANCE is kept current by the database triggers as part of each
+    chunk's transaction. progress, if given, is called with the number
+    of rows imported so far after each chunk; returning False stops the import.
+    Returns the number of rows imported.
+    """
+    income_rows = []
+    spend_rows = []
+    imported = 0
+
+    def flush():
+        # Both tables go into the same commit
+        with db.transaction():
+            if income_rows:
+                db.insert_data(database.INSERT_INCOME_SQL, income_rows)
+            if spend_rows:
+                db.insert_data(database.INSERT_SPEND_SQL, spend_rows)
+        database.mark_changed(db, 'INCOME', 'SPEND')
+        income_rows.clear()
+        spend_rows.clear()
+
+    for transaction in transactions:
+        month, date_key = database.parse_date(transaction.date)
+        if transaction.spend_type is None:
+            income_rows.append((month, date_key, transaction.amount))
+        else:
+            spend_rows.append((month, date_key, transaction.spend_type, transaction.amount))
+        imported += 1
+
+        if imported % chunk_size == 0:
+            flush()
+            if progress is not None and progress(imported) is False:
+                break
+    else:
+        flush()
+        if progress is not None:
+            progress(imported)
+
+    return imported
+
+
+def import_files(db, paths, chunk_size=1000, progress=None):
+    """Import one or more statement files. See import_transactions."""
+    return import_transactions(db, read_statements(paths), chunk_size, progress)
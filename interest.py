@@ -1,4 +1,17 @@
 import math
+from collections import namedtuple
+from decimal import Decimal, ROUND_HALF_UP
+
+# Result of the closed-form loan calculation
+LoanSummary = namedtuple('LoanSummary', ['months', 'total_paid', 'total_interest'])
+
+# Per-scenario results of batch_loan_summary; repayable is False where the
+# payment never covers the interest
+BatchLoanSummary = namedtuple('BatchLoanSummary', ['months', 'total_paid', 'total_interest', 'repayable'])
+
+# One month of a generated amortization schedule. The *_cents functions
+# produce the same rows with integer cents.
+ScheduleRow = namedtuple('ScheduleRow', ['month', 'payment', 'interest', 'principal', 'balance'])
 
 def Calculate_interest():
     while True:
@@ -39,7 +52,7 @@ def Calculate_interest():
         pass
         # time_to_payoff, total_paid = Calculate_simple_interest(initial, interestRate, payment)
     if loanType == "compound":
-        time_to_payoff, total_paid, balances, interests = Calculate_compound_interest(initial, interestRate, payment)
+        time_to_payoff, total_paid, total_interest = loan_summary(initial, interestRate, payment)
     else:
         print("Invalid loan type.")
         return
@@ -59,13 +72,250 @@ def Calculate_interest():
     time_to_save = initial / payment
     # visualization.plot_time_comparison(initial, time_to_payoff, time_to_save, payment, interestRate)
 
-def Calculate_compound_interest(amount, rate, payment):
-    """Calculate compound interest details."""
-    months = 0
-    total_paid = 0
-    balances = []  # Track loan balances over time
-    interests = []  # Track interest paid over time
+def loan_summary(amount, rate, payment):
+    """Calculate months to payoff, total paid and total interest in O(1).
+
+    Uses the standard annuity formulas instead of stepping through every
+    month. The result matches Calculate_compound_interest to the cent; a
+    sub-cent balance left over by floating point rounding is treated as paid.
+    """
+    if amount <= 0:
+        return LoanSummary(0, 0, 0)
+
+    monthly_rate = rate / 12
+    if payment <= amount * monthly_rate:
+        raise ValueError("Monthly payment is too low to cover the interest. Loan cannot be repaid.")
+
+    if monthly_rate == 0:
+        months = max(1, math.ceil(amount / payment - 1e-9))
+        final_payment = amount - payment * (months - 1)
+    else:
+        growth = 1 + monthly_rate
+        exact_months = -math.log(1 - amount * monthly_rate / payment) / math.log(growth)
+        months = max(1, math.ceil(exact_months - 1e-9))
+        final_payment = _balance_after(amount, monthly_rate, payment, months - 1) * growth
+        if final_payment < 0.005 and months > 1:
+            # Rounding put the payoff one month too late; the previous
+            # payment already cleared the balance
+            months -= 1
+            final_payment = _balance_after(amount, monthly_rate, payment, months - 1) * growth
+
+    total_paid = payment * (months - 1) + final_payment
+    return LoanSummary(months, total_paid, total_paid - amount)
+
+
+def _balance_after(amount, monthly_rate, payment, months):
+    """Remaining balance after the given number of full payments."""
+    growth = (1 + monthly_rate) ** months
+    return amount * growth - payment * (growth - 1) / monthly_rate
+
+
+def _annuity_factor(monthly_rate, months):
+    """Present value of 1 paid monthly for months, (1 - (1+r)^-n) / r."""
+    if monthly_rate == 0:
+        return months
+    # expm1/log1p keep full precision for tiny rates
+    return -math.expm1(-months * math.log1p(monthly_rate)) / monthly_rate
+
+
+def _check_term(months):
+    if months <= 0:
+        raise ValueError("The payoff period must be at least one month.")
+
+
+def required_payment(amount, rate, months):
+    """Level monthly payment that pays off amount in exactly months months."""
+    _check_term(months)
+    if amount <= 0:
+        return 0.0
+    return amount / _annuity_factor(rate / 12, months)
+
+
+def affordable_principal(payment, rate, months):
+    """Largest loan that payment clears in months months at rate."""
+    _check_term(months)
+    if payment <= 0:
+        return 0.0
+    return payment * _annuity_factor(rate / 12, months)
+
+
+# Annual rates are solved to within this
+RATE_TOLERANCE = 1e-12
+
+
+def required_rate(amount, payment, months, tolerance=RATE_TOLERANCE):
+    """Annual rate at which payment pays off amount in exactly months months.
+
+    The payment needed grows with the rate, so the root is bracketed between
+    0 and the rate whose interest alone would eat the whole payment, and
+    found with the Illinois variant of false position, which keeps the
+    bracket but converges superlinearly. Raises ValueError when even a 0%
+    loan would need a bigger payment.
+    """
+    _check_term(months)
+    if amount <= 0 or payment <= 0:
+        raise ValueError("Loan amount and payment must be positive.")
+    if payment * months < amount - 0.005:
+        raise ValueError("Payment doesn't cover the loan within that term even at 0% interest.")
+
+    def excess(rate):
+        return required_payment(amount, rate, months) - payment
+
+    low, high = 0.0, 12 * payment / amount
+    f_low, f_high = excess(low), excess(high)
+    if f_low >= 0:
+        return 0.0
+    side = 0
+    for _ in range(200):
+        rate = (low * f_high - high * f_low) / (f_high - f_low)
+        f_rate = excess(rate)
+        if f_rate == 0 or high - low < tolerance:
+            break
+        if f_rate < 0:
+            low, f_low = rate, f_rate
+            if side == -1:
+                f_high /= 2  # Illinois step: stop the stale end from pinning the estimate
+            side = -1
+        else:
+            high, f_high = rate, f_rate
+            if side == 1:
+                f_low /= 2
+            side = 1
+        if abs(f_rate) < 1e-12 * payment:
+            break
+    return rate
+
+
+def batch_loan_summary(principals, rates, payments):
+    """Evaluate many loan scenarios at once with NumPy.
+
+    principals, rates and payments are broadcast against each other, so
+    passing rates[:, None] and payments[None, :] evaluates a whole grid.
+    Scenarios that can never be repaid are flagged in the repayable mask
+    (their months are 0 and totals NaN) instead of raising.
+    """
+    # Imported here so the scalar functions stay cheap to load for the CLI
+    import numpy as np
+
+    principals, rates, payments = np.broadcast_arrays(
+        np.asarray(principals, dtype=float),
+        np.asarray(rates, dtype=float),
+        np.asarray(payments, dtype=float),
+    )
+    monthly_rate = rates / 12
+    repayable = (payments > principals * monthly_rate) & (payments > 0)
+    has_balance = repayable & (principals > 0)
+    zero_rate = monthly_rate == 0
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        growth = 1 + monthly_rate
+        exact_months = np.where(
+            zero_rate,
+            principals / payments,
+            -np.log1p(-principals * monthly_rate / payments) / np.log1p(monthly_rate),
+        )
+        months = np.maximum(1, np.ceil(exact_months - 1e-9))
+        months = np.where(has_balance, months, 0)
+
+        def final_payment(months):
+            growth_n = growth ** (months - 1)
+            balance = np.where(
+                zero_rate,
+                principals - payments * (months - 1),
+                principals * growth_n - payments * (growth_n - 1) / monthly_rate,
+            )
+            return balance * growth
+
+        last = final_payment(months)
+        # Same sub-cent correction as loan_summary
+        overshoot = has_balance & (last < 0.005) & (months > 1)
+        months = np.where(overshoot, months - 1, months)
+        last = np.where(overshoot, final_payment(months), last)
+
+        total_paid = np.where(has_balance, payments * (months - 1) + last, 0.0)
 
+    total_paid = np.where(repayable, total_paid, np.nan)
+    return BatchLoanSummary(
+        months.astype(np.int64),
+        total_paid,
+        total_paid - principals,
+        repayable,
+    )
+
+
+def loan_sensitivity_grid(amount, rates, payments):
+    """Evaluate one principal over every (rate, payment) pair.
+
+    Returns a BatchLoanSummary whose arrays have shape (len(rates), len(payments)).
+    """
+    import numpy as np
+
+    rates = np.asarray(rates, dtype=float)
+    payments = np.asarray(payments, dtype=float)
+    return batch_loan_summary(amount, rates[:, None], payments[None, :])
+
+
+def _batch_annuity_factor(monthly_rate, months):
+    import numpy as np
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factor = -np.expm1(-months * np.log1p(monthly_rate)) / monthly_rate
+    return np.where(monthly_rate == 0, months, factor)
+
+
+def batch_required_payment(principals, rates, months):
+    """required_payment over broadcast arrays; NaN where months < 1."""
+    import numpy as np
+
+    principals, rates, months = np.broadcast_arrays(
+        np.asarray(principals, dtype=float), np.asarray(rates, dtype=float), np.asarray(months, dtype=float)
+    )
+    payment = np.maximum(principals, 0) / _batch_annuity_factor(rates / 12, months)
+    return np.where(months >= 1, payment, np.nan)
+
+
+def batch_affordable_principal(payments, rates, months):
+    """affordable_principal over broadcast arrays; NaN where months < 1."""
+    import numpy as np
+
+    payments, rates, months = np.broadcast_arrays(
+        np.asarray(payments, dtype=float), np.asarray(rates, dtype=float), np.asarray(months, dtype=float)
+    )
+    principal = np.maximum(payments, 0) * _batch_annuity_factor(rates / 12, months)
+    return np.where(months >= 1, principal, np.nan)
+
+
+def batch_required_rate(principals, payments, months, iterations=64):
+    """required_rate over broadcast arrays; NaN where no rate >= 0 works.
+
+    Every scenario is bisected at once inside the same bracket as
+    required_rate, a fixed number of halvings that each cost one pass over
+    the arrays. 64 halvings narrow any bracket below float precision.
+    """
+    import numpy as np
+
+    principals, payments, months = np.broadcast_arrays(
+        np.asarray(principals, dtype=float), np.asarray(payments, dtype=float), np.asarray(months, dtype=float)
+    )
+    solvable = (principals > 0) & (payments > 0) & (months >= 1) & (payments * months >= principals - 0.005)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        low = np.zeros(principals.shape)
+        high = np.where(solvable, 12 * payments / principals, 0.0)
+        for _ in range(iterations):
+            middle = (low + high) / 2
+            too_high = principals >= payments * _batch_annuity_factor(middle / 12, months)
+            high = np.where(too_high, middle, high)
+            low = np.where(too_high, low, middle)
+    return np.where(solvable, (low + high) / 2, np.nan)
+
+
+def amortization_schedule(amount, rate, payment):
+    """Yield the month-by-month schedule of a loan as ScheduleRow tuples.
+
+    Rows are produced lazily, so callers that only need part of the schedule
+    never pay for the rest of it.
+    """
+    month = 0
     while amount > 0:
         # Calculate interest for the current month
         interest = amount * rate / 12  # Monthly interest
@@ -84,10 +334,62 @@ def Calculate_compound_interest(amount, rate, payment):
             principal_payment += amount  # Reduce principal payment
             amount = 0  # Set balance to zero
 
+        month += 1
+        yield ScheduleRow(month, payment, interest, principal_payment, max(amount, 0))
+
+
+def Calculate_compound_interest(amount, rate, payment):
+    """Calculate compound interest details."""
+    months = 0
+    total_paid = 0
+    balances = []  # Track loan balances over time
+    interests = []  # Track interest paid over time
+
+    for row in amortization_schedule(amount, rate, payment):
         # Update totals and logs
-        total_paid += payment
-        months += 1
-        balances.append(max(amount, 0))  # Ensure non-negative balance
-        interests.append(interest)
+        total_paid += row.payment
+        months = row.month
+        balances.append(row.balance)  # Ensure non-negative balance
+        interests.append(row.interest)
 
     return months, total_paid, balances, interests
+
+
+def amortization_schedule_cents(amount_cents, rate, payment_cents):
+    """Yield the schedule of a loan in exact integer cents.
+
+    Like a lender's statement, each month's interest is rounded half up to
+    the cent before the payment is applied, so there is no floating point
+    drift however long the loan runs. rate is the annual rate as a decimal;
+    pass it as a string (e.g. '0.065') to avoid binary rounding of the rate
+    itself.
+    """
+    monthly_rate = Decimal(str(rate)) / 12
+    balance = int(amount_cents)
+    payment_cents = int(payment_cents)
+    month = 0
+    while balance > 0:
+        interest = int((balance * monthly_rate).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+        if payment_cents <= interest:
+            raise ValueError("Monthly payment is too low to cover the interest. Loan cannot be repaid.")
+
+        payment = min(payment_cents, balance + interest)
+        principal_payment = payment - interest
+        balance -= principal_payment
+
+        month += 1
+        yield ScheduleRow(month, payment, interest, principal_payment, balance)
+
+
+def loan_summary_cents(amount_cents, rate, payment_cents):
+    """Months to payoff, total paid and total interest, all in integer cents.
+
+    Because interest is rounded every month the result depends on the whole
+    path, so this walks the schedule rather than using the closed form.
+    """
+    months = 0
+    total_paid = 0
+    for row in amortization_schedule_cents(amount_cents, rate, payment_cents):
+        months = row.month
+        total_paid += row.payment
+    return LoanSummary(months, total_paid, total_paid - max(int(amount_cents), 0))
@@ -0,0 +1,220 @@
+import glob
+import json
+import os
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import database
+
+# Write-behind batching: queued entries are committed together once FLUSH_MS
+# has passed since the first of them, or as soon as FLUSH_ROWS are waiting
+FLUSH_MS = 250
+FLUSH_ROWS = 200
+
+# Wait before trying a failed batch again
+RETRY_MS = 5000
+
+APPLIED_SEQ_SQL = "SELECT IFNULL((SELECT Seq FROM APPLIED_WRITES WHERE Writer = ?), 0)"
+
+# Writer of journal entries made before writers had ids
+LEGACY_WRITER = ''
+
+
+def new_writer_id():
+    """A fresh id for one writer; its writes are numbered from 1."""
+    return uuid.uuid4().hex
+
+
+def journal_path(db_name, writer=LEGACY_WRITER):
+    """The writer's journal kept next to a database file; None for in-memory databases."""
+    if db_name == ':memory:':
+        return None
+    return db_name + (f'-writes-{writer}.jsonl' if writer else '-writes.jsonl')
+
+
+def journal_paths(db_name):
+    """Every writer's journal next to a database file."""
+    if db_name == ':memory:':
+        return []
+    return sorted(glob.glob(glob.escape(db_name) + '-writes*.jsonl'))
+
+
+def _try_lock(f):
+    """Take an exclusive lock on an open file without waiting; False if it's held."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def make_entry(writer, seq, kind, date, amount, spend_type=None):
+    """Validate one income or spending write and turn it into a journal entry.
+
+    Raises ValueError for a bad date, amount or missing spending type, so
+    nothing invalid is ever queued.
+    """
+    month, date_key = database.parse_date(date)
+    if kind == 'spend' and not (spend_type or '').strip():
+        raise ValueError("Spending needs a type.")
+    return {'writer': writer, 'seq': seq, 'kind': kind, 'month': month, 'date_key': date_key,
+            'type': spend_type if kind == 'spend' else None, 'amount': database.to_cents(amount)}
+
+
+def net_amount(entry):
+    """The entry's effect on the running balance, in cents."""
+    return entry['amount'] if entry['kind'] == 'income' else -entry['amount']
+
+
+def read_journal(path):
+    """Entries in a journal file, oldest first. A torn last line is skipped."""
+    if not path or not os.path.exists(path):
+        return []
+    entries = []
+    with open(path) as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                break  # Only the final append can be incomplete
+    return entries
+
+
+class Journal:
+    """Append-only file of one writer's queued writes that aren't committed yet.
+
+    Every append is flushed and fsynced before it returns, so an entry the
+    GUI has accepted survives a crash. Once a batch commits, the file is
+    rewritten with just the entries still waiting. While open, the journal
+    holds an exclusive lock on its path + '.lock' so replay_journals leaves
+    it alone. path=None keeps nothing on disk.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = self._lock = None
+        if path:
+            self._lock = open(path + '.lock', 'a')
+            if not _try_lock(self._lock):
+                self._lock.close()
+                raise OSError(f"Journal {path} is in use by another writer.")
+            self._file = open(path, 'a')
+
+    def append(self, entry):
+        if self._file is None:
+            return
+        self._file.write(json.dumps(entry) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def rewrite(self, entries):
+        """Replace the file's contents with entries, atomically."""
+        if self._file is None:
+            return
+        self._file.close()
+        temp = self.path + '.tmp'
+        with open(temp, 'w') as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, self.path)
+        self._file = open(self.path, 'a')
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._lock is not None:
+            self._lock.close()  # Releases the lock
+            self._lock = None
+
+
+def applied_seq(db, writer=LEGACY_WRITER):
+    return db.get_data(APPLIED_SEQ_SQL, (writer,))[0][0]
+
+
+def apply_entries(db, entries):
+    """Commit a batch of journal entries in one transaction.
+
+    Entries at or below their writer's APPLIED_WRITES.Seq were committed
+    before and are skipped, which makes replaying a journal safe. Writers
+    number their entries independently, so several of them can share a
+    database. The aggregate triggers run inside the same transaction and
+    the query cache is invalidated once for the whole batch. Returns the
+    number of rows inserted.
+    """
+    # Immediate, so no other writer can commit between reading the applied
+    # seqs and advancing them
+    with db.transaction(immediate=True):
+        done = {}
+        fresh = []
+        for entry in entries:
+            writer = entry.get('writer', LEGACY_WRITER)
+            if writer not in done:
+                done[writer] = applied_seq(db, writer)
+            if entry['seq'] > done[writer]:
+                fresh.append(entry)
+        if not fresh:
+            return 0
+        income = [(e['month'], e['date_key'], e['amount']) for e in fresh if e['kind'] == 'income']
+        spend = [(e['month'], e['date_key'], e['type'], e['amount']) for e in fresh if e['kind'] == 'spend']
+        if income:
+            db.insert_data(database.INSERT_INCOME_SQL, income)
+        if spend:
+            db.insert_data(database.INSERT_SPEND_SQL, spend)
+        last = {}
+        for entry in fresh:
+            writer = entry.get('writer', LEGACY_WRITER)
+            last[writer] = max(last.get(writer, 0), entry['seq'])
+        db.insert_data("""
+            INSERT INTO APPLIED_WRITES (Writer, Seq) VALUES (?, ?)
+            ON CONFLICT(Writer) DO UPDATE SET Seq = excluded.Seq
+        """, list(last.items()))
+    mark = [table for table, rows in (('INCOME', income), ('SPEND', spend)) if rows]
+    database.mark_changed(db, *mark)
+    return len(fresh)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass  # Another replay got there first
+
+
+def replay_journals(db):
+    """Commit whatever writers that are gone left in db's journals.
+
+    Journals still locked by a live writer, in this process or another,
+    are skipped. The others are committed and then deleted. Returns the
+    number of rows that still needed committing.
+    """
+    count = 0
+    for path in journal_paths(db.db_name):
+        with open(path + '.lock', 'a') as lock:
+            if not _try_lock(lock):
+                continue
+            count += apply_entries(db, read_journal(path))
+            _remove(path)
+        _remove(path + '.lock')
+    return count
+
+
+def read_balance(db, writer):
+    """(running balance in cents, writer's last applied seq), read in one snapshot.
+
+    The seq tells a caller with queued writes which of them the balance
+    already includes.
+    """
+    return db.get_data(f"""
+        SELECT (SELECT Income - Spend FROM RUNNING_TOTALS WHERE Id = 1), ({APPLIED_SEQ_SQL})
+    """, (writer,))[0]
@@ -1,89 +1,78 @@
+import time
+
+# Taken before any heavy import so the startup report covers them
+_PROCESS_START = time.perf_counter()
+
+import os
 import sys
-import matplotlib.pyplot as plt
-from PyQt5.QtWidgets import QApplication, QMainWindow, QPushButton, QGridLayout, QWidget, QSpacerItem, QSizePolicy, QDialog, QVBoxLayout, QRadioButton, QDialogButtonBox, QLineEdit, QLabel, QScrollArea
-from PyQt5.QtCore import Qt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
+from PyQt5.QtWidgets import QApplication, QMainWindow, QPushButton, QGridLayout, QWidget, QSpacerItem, QSizePolicy, QDialog, QVBoxLayout, QRadioButton, QDialogButtonBox, QLineEdit, QLabel, QScrollArea, QFileDialog, QProgressDialog, QMessageBox, QComboBox, QTableView, QHBoxLayout, QAbstractItemView, QInputDialog, QCheckBox, QTableWidget, QTableWidgetItem, QPlainTextEdit
+from PyQt5.QtCore import Qt, QTimer
+import accounts
+import chart_data
 import database
+import forecast
+import importer
+import journal
+from diagnostics import query_stats
 import interest
+import workers
+
+# matplotlib (and the charts module built on it) is imported on first use,
+# after the window is already on screen
+
+# Rates and payments sampled along each axis of the sensitivity heatmap
+SENSITIVITY_STEPS = 100
+
+
+class StartupTimer:
+    """Records how long each startup phase took since the process started.
+
+    Enabled with --startup-report or FINANCE_STARTUP_REPORT=1; the report is
+    printed to stderr once the first chart has been drawn.
+    """
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.marks = []
+
+    def mark(self, name):
+        if self.enabled and name not in dict(self.marks):
+            self.marks.append((name, time.perf_counter()))
+
+    def report(self):
+        if not self.enabled:
+            return
+        print("Startup timing (ms since process start):", file=sys.stderr)
+        previous = _PROCESS_START
+        for name, moment in self.marks:
+            print(f"  {name:<20} {(moment - _PROCESS_START) * 1000:8.1f}  (+{(moment - previous) * 1000:.1f})",
+                  file=sys.stderr)
+            previous = moment
+
+
+startup_timer = StartupTimer('--startup-report' in sys.argv or os.environ.get('FINANCE_STARTUP_REPORT') == '1')
+startup_timer.mark('imports')
+
+
+def validate_date(parent, text):
+    """Warn and return False if text isn't a date the database accepts."""
+    try:
+        database.parse_date(text)
+    except ValueError as e:
+        QMessageBox.warning(parent, "Invalid Date", str(e))
+        return False
+    return True
 
-class GraphWidget(FigureCanvas):
-    def __init__(self, parent=None, width=5, height=4, dpi=100):
-        fig, ax = plt.subplots(figsize=(width, height), dpi=dpi)
-        self.ax = ax
-        FigureCanvas.__init__(self, fig)
-        self.setParent(parent)
-
-    def plot_balance(self, db):
-        # Fetch monthly balance data from the database
-        balance_data = database.get_monthly_balance(db)
-        if balance_data:  # Check if data exists
-            months = [row[0] for row in balance_data]
-            balances = [row[1] for row in balance_data]
-
-            # Clear the axes and plot the balance data
-            self.ax.clear()
-            self.ax.bar(months, balances, label='Balance', color='blue')
-            self.ax.set_title('Monthly Balance')
-            self.ax.set_xlabel('Month')
-            self.ax.set_ylabel('Balance')
-            self.ax.legend()
-
-            # Adjust x-axis labels for better readability (if needed)
-            self.ax.tick_params(axis='x', rotation=0)
-
-            self.draw()
-
-    def plot_expenses(self, db):
-        # Fetch monthly expenses data from the database
-        expense_data = database.get_monthly_spending(db, "2024-09")
-        if expense_data:  # Check if data exists
-            categories = [row[0] for row in expense_data]
-            expenses = [row[1] for row in expense_data]
-
-            # Clear the axes and plot the expenses data
-            self.ax.clear()
-            self.ax.bar(categories, expenses, label='Expenses', color='red')
-            self.ax.set_title('Monthly Expenses')
-            self.ax.set_xlabel('Category')
-            self.ax.set_ylabel('Amount')
-            self.ax.legend()
-
-            # Adjust x-axis labels for better readability (if needed)
-            self.ax.tick_params(axis='x', rotation=0)
-
-            self.draw()
-
-    def plot_income(self, db):
-        # Fetch monthly income data from the database
-        income_data = database.get_monthly_income(db)
-        if income_data:  # Check if data exists
-            months = [row[0] for row in income_data]
-            incomes = [row[1] for row in income_data]
-
-            # Clear the axes and plot the income data
-            self.ax.clear()
-            self.ax.plot(months, incomes, label='Income', color='green', marker='o')
-            self.ax.set_title('Monthly Income')
-            self.ax.set_xlabel('Month')
-            self.ax.set_ylabel('Income')
-            self.ax.legend()
-
-            # Adjust x-axis labels for better readability (if needed)
-            self.ax.tick_params(axis='x', rotation=0)
-
-            self.draw()
 
 class AddIncomeDialog(QDialog):
-    def __init__(self, db, parent=None):
+    def __init__(self, parent=None):
         super().__init__(parent)
-        self.db = db
         self.setWindowTitle("Add Income")
 
         layout = QVBoxLayout()
         
         self.date_input = QLineEdit()
-        self.date_input.setPlaceholderText("Enter Date (YYYY-MM)")
+        self.date_input.setPlaceholderText("Enter Date (YYYY-MM-DD or YYYY-MM)")
         layout.addWidget(self.date_input)
 
         self.amount_input = QLineEdit()
@@ -98,22 +87,24 @@ class AddIncomeDialog(QDialog):
         self.setLayout(layout)
 
     def add_income(self):
+        # The write itself is run in the background by MainWindow
         date = self.date_input.text()
         amount = self.amount_input.text()
-        if date and amount:
-            database.add_income(self.db, date, amount)
+        if date and amount and validate_date(self, date):
             self.accept()
 
+    def get_values(self):
+        return self.date_input.text(), self.amount_input.text()
+
 class AddExpenseDialog(QDialog):
-    def __init__(self, db, parent=None):
+    def __init__(self, parent=None):
         super().__init__(parent)
-        self.db = db
         self.setWindowTitle("Add Expense")
 
         layout = QVBoxLayout()
 
         self.date_input = QLineEdit()
-        self.date_input.setPlaceholderText("Enter Date (YYYY-MM)")
+        self.date_input.setPlaceholderText("Enter Date (YYYY-MM-DD or YYYY-MM)")
         layout.addWidget(self.date_input)
 
         self.type_input = QLineEdit()
@@ -132,13 +123,16 @@ class AddExpenseDialog(QDialog):
         self.setLayout(layout)
 
     def add_expense(self):
+        # The write itself is run in the background by MainWindow
         date = self.date_input.text()
         spend_type = self.type_input.text()
         amount = self.amount_input.text()
-        if date and spend_type and amount:
-            database.add_spend(self.db, date, spend_type, amount)
+        if date and spend_type and amount and validate_date(self, date):
             self.accept()
 
+    def get_values(self):
+        return self.date_input.text(), self.type_input.text(), self.amount_input.text()
+
 class DebtCalculatorDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -181,8 +175,10 @@ class DebtCalculatorDialog(QDialog):
         self.setLayout(layout)
 
 class DebtCalculatorDialog(QDialog):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, queries=None):
         super().__init__(parent)
+        # Runs the Monte Carlo simulation off the GUI thread
+        self.queries = queries
         self.setWindowTitle("Debt Calculator")
         self.setMinimumSize(400, 300)  # Set a minimum size for the dialog
         self.setModal(True)
@@ -204,6 +200,21 @@ class DebtCalculatorDialog(QDialog):
         self.monthly_payment_input.setPlaceholderText("Enter monthly payment ($)")
         layout.addWidget(self.monthly_payment_input)
 
+        # Goal seek: solve one of the three inputs above for a payoff period
+        goal_layout = QHBoxLayout()
+        self.months_input = QLineEdit()
+        self.months_input.setPlaceholderText("Pay off in (months)")
+        goal_layout.addWidget(self.months_input)
+        self.solve_for_input = QComboBox()
+        for label, key in (("Solve for payment", 'payment'), ("Solve for rate", 'rate'),
+                           ("Solve for loan amount", 'amount')):
+            self.solve_for_input.addItem(label, key)
+        goal_layout.addWidget(self.solve_for_input)
+        goal_seek_button = QPushButton("Goal Seek")
+        goal_seek_button.clicked.connect(self.goal_seek)
+        goal_layout.addWidget(goal_seek_button)
+        layout.addLayout(goal_layout)
+
         # Scrollable Area for Results
         scroll_area = QScrollArea()
         scroll_area.setWidgetResizable(True)
@@ -218,11 +229,27 @@ class DebtCalculatorDialog(QDialog):
         scroll_area.setWidget(scroll_widget)
         layout.addWidget(scroll_area)
 
+        # Sensitivity heatmap, created the first time a grid is requested so
+        # opening the dialog doesn't pay for NumPy and matplotlib
+        self.grid_canvas = None
+        self.grid_index = layout.count()
+
         # Calculate Button
         calculate_button = QPushButton("Calculate")
         calculate_button.clicked.connect(self.calculate_interest)
         layout.addWidget(calculate_button)
 
+        # Sensitivity Grid Button
+        grid_button = QPushButton("Sensitivity Grid")
+        grid_button.clicked.connect(self.show_sensitivity_grid)
+        layout.addWidget(grid_button)
+
+        # Monte Carlo Button, only when there is a database to sample from
+        if queries is not None:
+            self.simulate_button = QPushButton("Simulate From History")
+            self.simulate_button.clicked.connect(self.run_simulation)
+            layout.addWidget(self.simulate_button)
+
         # Close Button
         close_button = QPushButton("Close")
         close_button.clicked.connect(self.close)
@@ -230,6 +257,141 @@ class DebtCalculatorDialog(QDialog):
 
         self.setLayout(layout)
 
+    def show_sensitivity_grid(self):
+        """Render total interest over a rate x payment grid around the inputs."""
+        try:
+            loan_amount = float(self.loan_amount_input.text())
+            interest_rate = float(self.interest_rate_input.text()) / 100  # Convert to decimal
+            monthly_payment = float(self.monthly_payment_input.text())
+
+            if loan_amount <= 0 or interest_rate < 0 or monthly_payment <= 0:
+                raise ValueError("All values must be positive.")
+        except ValueError as e:
+            self.results_label.setText(f"Error: {e}")
+            return
+
+        import numpy as np
+        from charts import Figure, FigureCanvas
+
+        if self.grid_canvas is None:
+            self.grid_canvas = FigureCanvas(Figure(figsize=(5, 4), dpi=100))
+            self.grid_canvas.setMinimumHeight(300)
+            self.layout().insertWidget(self.grid_index, self.grid_canvas)
+
+        # Scan from no interest to twice the entered rate, and from half to
+        # twice the entered payment
+        rates = np.linspace(0, max(interest_rate * 2, 0.01), SENSITIVITY_STEPS)
+        payments = np.linspace(monthly_payment / 2, monthly_payment * 2, SENSITIVITY_STEPS)
+        grid = interest.loan_sensitivity_grid(loan_amount, rates, payments)
+
+        figure = self.grid_canvas.figure
+        figure.clear()
+        ax = figure.add_subplot()
+        image = ax.imshow(
+            np.ma.masked_invalid(grid.total_interest),
+            origin='lower',
+            aspect='auto',
+            extent=(payments[0], payments[-1], rates[0] * 100, rates[-1] * 100),
+            cmap='viridis',
+        )
+        figure.colorbar(image, ax=ax, label='Total Interest ($)')
+        ax.plot(monthly_payment, interest_rate * 100, marker='x', color='red')
+        ax.set_title('Total Interest (blank = never repaid)')
+        ax.set_xlabel('Monthly Payment ($)')
+        ax.set_ylabel('Interest Rate (%)')
+        self.grid_canvas.show()
+        self.grid_canvas.draw()
+
+        self.results_label.setText(
+            f"{grid.repayable.sum()} of {grid.repayable.size} combinations can be repaid."
+        )
+
+    def run_simulation(self):
+        """Bootstrap loan-versus-save outcomes from the recorded monthly cash flow."""
+        try:
+            loan_amount = float(self.loan_amount_input.text())
+            interest_rate = float(self.interest_rate_input.text()) / 100  # Convert to decimal
+            monthly_payment = float(self.monthly_payment_input.text())
+
+            if loan_amount <= 0 or interest_rate < 0 or monthly_payment <= 0:
+                raise ValueError("All values must be positive.")
+        except ValueError as e:
+            self.results_label.setText(f"Error: {e}")
+            return
+
+        import simulation
+
+        self.simulate_button.setEnabled(False)
+        self.results_label.setText("Simulating...")
+        # Rates drift by about one point a year to cover a variable-rate loan
+        self.queries.submit(
+            'simulation', simulation.simulate_from_history, loan_amount, interest_rate, monthly_payment,
+            0.01, on_result=self.show_simulation, on_error=self.show_simulation_error,
+        )
+
+    def show_simulation(self, summary):
+        self.simulate_button.setEnabled(True)
+
+        def months(value):
+            return "never" if value == float('inf') else f"{value:.0f} months"
+
+        def dollars(value):
+            return "never repaid" if value == float('inf') else f"${value:,.2f}"
+
+        lines = [f"{summary['paths']:,} paths sampled from {summary['history_months']} months of history"]
+        for p in sorted(summary['loan_months']):
+            lines.append(
+                f"P{p}: loan paid off in {months(summary['loan_months'][p])}, "
+                f"interest {dollars(summary['loan_interest'][p])}; "
+                f"saved up in {months(summary['save_months'][p])}"
+            )
+        lines.append(f"Loan repaid within 50 years: {summary['loan_repaid']:.1%}")
+        lines.append(f"Savings goal reached within 50 years: {summary['save_reached']:.1%}")
+        self.results_label.setText("\n".join(lines))
+
+    def show_simulation_error(self, message):
+        self.simulate_button.setEnabled(True)
+        self.results_label.setText(f"Error: {message}")
+
+    def goal_seek(self):
+        """Fill in the payment, rate or loan amount that pays off in the given months."""
+        solve_for = self.solve_for_input.currentData()
+        try:
+            months = int(self.months_input.text())
+            if months <= 0:
+                raise ValueError("Months must be a positive whole number.")
+            if solve_for == 'payment':
+                loan_amount = float(self.loan_amount_input.text())
+                interest_rate = float(self.interest_rate_input.text()) / 100
+                if loan_amount <= 0 or interest_rate < 0:
+                    raise ValueError("All values must be positive.")
+                monthly_payment = interest.required_payment(loan_amount, interest_rate, months)
+                self.monthly_payment_input.setText(f"{monthly_payment:.2f}")
+            elif solve_for == 'rate':
+                loan_amount = float(self.loan_amount_input.text())
+                monthly_payment = float(self.monthly_payment_input.text())
+                interest_rate = interest.required_rate(loan_amount, monthly_payment, months)
+                self.interest_rate_input.setText(f"{interest_rate * 100:.4f}")
+            else:
+                interest_rate = float(self.interest_rate_input.text()) / 100
+                monthly_payment = float(self.monthly_payment_input.text())
+                if interest_rate < 0 or monthly_payment <= 0:
+                    raise ValueError("All values must be positive.")
+                loan_amount = interest.affordable_principal(monthly_payment, interest_rate, months)
+                self.loan_amount_input.setText(f"{loan_amount:.2f}")
+        except ValueError as e:
+            self.results_label.setText(f"Error: {e}")
+            return
+
+        self.results_label.setText(
+            f"Loan Amount: ${loan_amount:,.2f}\n"
+            f"Interest Rate: {interest_rate * 100:.4f}%\n"
+            f"Monthly Payment: ${monthly_payment:,.2f}\n"
+            f"Paid off in {months} months\n"
+            f"Total Paid: ${monthly_payment * months:,.2f}\n"
+            f"Total Interest Paid: ${monthly_payment * months - loan_amount:,.2f}"
+        )
+
     def calculate_interest(self):
         """Perform the interest calculation and display results."""
         try:
@@ -240,8 +402,8 @@ class DebtCalculatorDialog(QDialog):
             if loan_amount <= 0 or interest_rate < 0 or monthly_payment <= 0:
                 raise ValueError("All values must be positive.")
 
-            # Call the interest calculation function
-            months, total_paid, balances, interests = interest.Calculate_compound_interest(
+            # Closed-form calculation; the month-by-month schedule isn't needed here
+            months, total_paid, total_interest = interest.loan_summary(
                 loan_amount, interest_rate, monthly_payment
             )
 
@@ -252,16 +414,168 @@ class DebtCalculatorDialog(QDialog):
                 f"Monthly Payment: ${monthly_payment:.2f}\n"
                 f"Time to Pay Off: {months} months\n"
                 f"Total Paid: ${total_paid:.2f}\n"
-                f"Total Interest Paid: ${total_paid - loan_amount:.2f}\n"
+                f"Total Interest Paid: ${total_interest:.2f}\n"
                 f"Time to Save for Purchase: {loan_amount / monthly_payment:.2f} months"
             )
         except ValueError as e:
             self.results_label.setText(f"Error: {e}")
 
 
-class GraphSelectionDialog(QDialog):
+class TransactionBrowserDialog(QDialog):
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Transactions")
+        self.setMinimumSize(600, 500)
+
+        layout = QVBoxLayout()
+
+        # Filters, applied in the database query
+        filters = QHBoxLayout()
+        self.table_input = QComboBox()
+        self.table_input.addItem("All", None)
+        self.table_input.addItem("Income", 'INCOME')
+        self.table_input.addItem("Spending", 'SPEND')
+        filters.addWidget(self.table_input)
+
+        self.category_input = QComboBox()
+        self.category_input.addItem("All categories", None)
+        for category in database.get_spend_categories(db):
+            self.category_input.addItem(category, category)
+        filters.addWidget(self.category_input)
+
+        self.month_input = QLineEdit()
+        self.month_input.setPlaceholderText("Month (YYYY-MM)")
+        filters.addWidget(self.month_input)
+
+        apply_button = QPushButton("Filter")
+        apply_button.clicked.connect(self.apply_filters)
+        filters.addWidget(apply_button)
+        layout.addLayout(filters)
+
+        # Rows are loaded a page at a time as the table scrolls
+        import browser
+        self.model = browser.TransactionTableModel(db, parent=self)
+        self.view = QTableView()
+        self.view.setModel(self.model)
+        self.view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.view.verticalHeader().hide()
+        self.view.horizontalHeader().setStretchLastSection(True)
+        self.view.setSortingEnabled(True)
+        self.view.sortByColumn(0, Qt.DescendingOrder)  # Newest first; loads the first page
+        layout.addWidget(self.view)
+
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.close)
+        layout.addWidget(close_button)
+
+        self.setLayout(layout)
+
+    def apply_filters(self):
+        month = self.month_input.text().strip() or None
+        if month is not None and not validate_date(self, month):
+            return
+        self.model.set_filters(self.table_input.currentData(), self.category_input.currentData(), month)
+
+
+class DiagnosticsDialog(QDialog):
+    """Statement timings, render spans and the slow-query log."""
+
+    COLUMNS = ("Statement", "Count", "Total ms", "p50", "p95", "p99", "Rows")
+
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.setWindowTitle("Diagnostics")
+        self.setMinimumSize(800, 600)
+
+        layout = QVBoxLayout()
+
+        controls = QHBoxLayout()
+        self.enabled_input = QCheckBox("Record queries")
+        self.enabled_input.setChecked(query_stats.enabled)
+        self.enabled_input.toggled.connect(self.toggle_enabled)
+        controls.addWidget(self.enabled_input)
+        controls.addWidget(QLabel("Slow query threshold (ms):"))
+        self.slow_input = QLineEdit(f"{query_stats.slow_ms:g}")
+        self.slow_input.setFixedWidth(80)
+        self.slow_input.editingFinished.connect(self.set_slow_ms)
+        controls.addWidget(self.slow_input)
+        controls.addStretch()
+        for text, slot in (("Refresh", self.refresh), ("Reset", self.reset), ("Save JSON...", self.save)):
+            button = QPushButton(text)
+            button.clicked.connect(slot)
+            controls.addWidget(button)
+        layout.addLayout(controls)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().hide()
+        self.table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.table)
+
+        layout.addWidget(QLabel("Slow queries"))
+        self.slow_log = QPlainTextEdit()
+        self.slow_log.setReadOnly(True)
+        layout.addWidget(self.slow_log)
+
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.close)
+        layout.addWidget(close_button)
+
+        self.setLayout(layout)
+        self.refresh()
+
+    def toggle_enabled(self, checked):
+        if checked:
+            query_stats.enable()
+        else:
+            query_stats.disable()
+
+    def set_slow_ms(self):
+        try:
+            query_stats.slow_ms = max(0.0, float(self.slow_input.text()))
+        except ValueError:
+            self.slow_input.setText(f"{query_stats.slow_ms:g}")
+
+    def refresh(self):
+        snapshot = query_stats.snapshot()
+        rows = [(sql, stats) for sql, stats in snapshot['statements'].items()]
+        rows += [(f"[span] {name}", stats) for name, stats in snapshot['spans'].items()]
+        self.table.setRowCount(len(rows))
+        for row, (name, stats) in enumerate(rows):
+            values = (name, stats['count'], stats['total_ms'], stats['p50_ms'], stats['p95_ms'], stats['p99_ms'],
+                      stats['rows'])
+            for column, value in enumerate(values):
+                text = f"{value:.2f}" if isinstance(value, float) else str(value)
+                item = QTableWidgetItem(text)
+                if column:
+                    item.setTextAlignment(int(Qt.AlignRight | Qt.AlignVCenter))
+                self.table.setItem(row, column, item)
+        self.table.resizeColumnsToContents()
+
+        lines = []
+        for entry in reversed(snapshot['slow_log']):
+            lines.append(f"{entry['ms']:.1f} ms, {entry['rows']} rows: {entry['sql']}")
+            lines.extend(f"    {step}" for step in entry['plan'] or ())
+        self.slow_log.setPlainText("\n".join(lines))
+
+    def reset(self):
+        query_stats.reset()
+        self.refresh()
+
+    def save(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save Diagnostics", "diagnostics.json", "JSON (*.json)")
+        if not path:
+            return
+        try:
+            query_stats.dump(path)
+        except OSError as e:
+            QMessageBox.warning(self, "Save Diagnostics", str(e))
+
+
+class GraphSelectionDialog(QDialog):
+    def __init__(self, parent=None, months=()):
+        super().__init__(parent)
 
         self.setWindowTitle("Select Graph")
         self.setModal(True)
@@ -272,6 +586,9 @@ class GraphSelectionDialog(QDialog):
         self.balance_radio = QRadioButton("Monthly Balance")
         self.expenses_radio = QRadioButton("Monthly Expenses")
         self.income_radio = QRadioButton("Monthly Income")
+        self.stacked_radio = QRadioButton("Spending by Category")
+        self.trend_radio = QRadioButton("Category Trends")
+        self.forecast_radio = QRadioButton("Balance Forecast")
 
         # Set the default option (Monthly Balance)
         self.balance_radio.setChecked(True)
@@ -279,6 +596,44 @@ class GraphSelectionDialog(QDialog):
         layout.addWidget(self.balance_radio)
         layout.addWidget(self.expenses_radio)
         layout.addWidget(self.income_radio)
+        layout.addWidget(self.stacked_radio)
+        layout.addWidget(self.trend_radio)
+        layout.addWidget(self.forecast_radio)
+
+        # Month for Monthly Expenses, and the range for the category charts;
+        # by default the latest month and the last year
+        months = list(months)
+        self.month_input = QComboBox()
+        self.start_input = QComboBox()
+        self.end_input = QComboBox()
+        for combo in (self.month_input, self.start_input, self.end_input):
+            combo.addItems(months)
+        if months:
+            self.month_input.setCurrentIndex(len(months) - 1)
+            self.start_input.setCurrentIndex(max(0, len(months) - 12))
+            self.end_input.setCurrentIndex(len(months) - 1)
+
+        month_row = QHBoxLayout()
+        month_row.addWidget(QLabel("Expenses month:"))
+        month_row.addWidget(self.month_input)
+        layout.addLayout(month_row)
+
+        range_row = QHBoxLayout()
+        range_row.addWidget(QLabel("Categories from:"))
+        range_row.addWidget(self.start_input)
+        range_row.addWidget(QLabel("to:"))
+        range_row.addWidget(self.end_input)
+        layout.addLayout(range_row)
+
+        # How far ahead the balance forecast reaches
+        self.horizon_input = QComboBox()
+        for months_ahead in forecast.HORIZONS:
+            self.horizon_input.addItem(f"{months_ahead} months", months_ahead)
+        self.horizon_input.setCurrentIndex(self.horizon_input.findData(forecast.DEFAULT_HORIZON))
+        horizon_row = QHBoxLayout()
+        horizon_row.addWidget(QLabel("Forecast ahead:"))
+        horizon_row.addWidget(self.horizon_input)
+        layout.addLayout(horizon_row)
 
         # Create a button box (OK, Cancel)
         button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
@@ -296,6 +651,24 @@ class GraphSelectionDialog(QDialog):
             return 'expenses'
         elif self.income_radio.isChecked():
             return 'income'
+        elif self.stacked_radio.isChecked():
+            return 'stacked'
+        elif self.trend_radio.isChecked():
+            return 'trend'
+        elif self.forecast_radio.isChecked():
+            return 'forecast'
+
+    def get_graph_args(self):
+        """Extra loader arguments for the selected graph."""
+        graph_type = self.get_selected_graph()
+        if graph_type == 'expenses':
+            return (self.month_input.currentText() or None,)
+        if graph_type in ('stacked', 'trend'):
+            start, end = sorted((self.start_input.currentText(), self.end_input.currentText()))
+            return (start or None, end or None)
+        if graph_type == 'forecast':
+            return (self.horizon_input.currentData(),)
+        return ()
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -304,8 +677,26 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("Finance Planner")
         self.setMinimumSize(1200, 600)
 
-        # Initialize database
-        self.db = database.Database()
+        # Initialize database. Each account has its own file; the combined
+        # view (self.account is None) reads all of them.
+        self.accounts = accounts.load_accounts()
+        self.account = next(iter(self.accounts))
+        self.db = database.Database(self.accounts[self.account])
+        database.migrate(self.db)
+        self.replay_journals()
+        startup_timer.mark('db_open')
+
+        # Queries and writes run on worker threads with their own connections
+        self.queries = workers.QueryRunner(self.db.db_name, self)
+        self.queries.busy_changed.connect(self.set_loading)
+
+        # Income and spending entered here are queued and committed in
+        # batches; one queue per database file, created on first use. Their
+        # writes are numbered under this window's own writer id.
+        self.write_queues = {}
+        self.writer = journal.new_writer_id()
+        self.committed_balance = None  # (cents, applied seq) of the last balance read
+        self.import_job = None  # workers.ImportProgress of the running import
 
         central_widget = QWidget(self)
         self.setCentralWidget(central_widget)
@@ -317,19 +708,30 @@ class MainWindow(QMainWindow):
         self.running_balance_label.setStyleSheet("font-size: 16px; font-weight: bold; color: green;")
         layout.addWidget(self.running_balance_label, 0, 1, alignment=Qt.AlignmentFlag.AlignLeft)
 
+        # Account Selector
+        self.account_input = QComboBox()
+        self.fill_account_input()
+        self.account_input.activated.connect(self.switch_account)
+        layout.addWidget(self.account_input, 0, 3)
+
+        # New Account Button
+        self.new_account_button = QPushButton("New Account")
+        self.new_account_button.clicked.connect(self.open_new_account_dialog)
+        layout.addWidget(self.new_account_button, 0, 4)
+
         # Add Income Button
-        add_income_button = QPushButton("Add Income")
-        add_income_button.setFixedHeight(50)
-        add_income_button.clicked.connect(self.open_add_income_dialog)  # Connect to income dialog
-        layout.addWidget(add_income_button, 2, 1)
+        self.add_income_button = QPushButton("Add Income")
+        self.add_income_button.setFixedHeight(50)
+        self.add_income_button.clicked.connect(self.open_add_income_dialog)  # Connect to income dialog
+        layout.addWidget(self.add_income_button, 2, 1)
 
         layout.addItem(QSpacerItem(20, 40, QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Expanding), 2, 1)
 
         # Add Expense Button
-        add_expenses_button = QPushButton("Add Expenses")
-        add_expenses_button.setFixedHeight(50)
-        add_expenses_button.clicked.connect(self.open_add_expense_dialog)  # Connect to expense dialog
-        layout.addWidget(add_expenses_button, 4, 1)
+        self.add_expenses_button = QPushButton("Add Expenses")
+        self.add_expenses_button.setFixedHeight(50)
+        self.add_expenses_button.clicked.connect(self.open_add_expense_dialog)  # Connect to expense dialog
+        layout.addWidget(self.add_expenses_button, 4, 1)
 
         layout.addItem(QSpacerItem(20, 40, QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Expanding), 4, 1)
 
@@ -341,8 +743,29 @@ class MainWindow(QMainWindow):
 
         layout.addItem(QSpacerItem(20, 40, QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Expanding), 6, 1)
 
-        # Create the graph widget first
-        self.graph_widget = GraphWidget(self, width=5, height=4)
+        # Import Statements Button
+        self.import_button = QPushButton("Import Statements")
+        self.import_button.setFixedHeight(50)
+        self.import_button.clicked.connect(self.open_import_dialog)
+        layout.addWidget(self.import_button, 7, 1)
+
+        # Browse Transactions Button
+        self.browse_button = QPushButton("Browse Transactions")
+        self.browse_button.setFixedHeight(50)
+        self.browse_button.clicked.connect(self.open_browser_dialog)
+        layout.addWidget(self.browse_button, 8, 1)
+
+        # Query timings and the slow-query log
+        diagnostics_button = QPushButton("Diagnostics")
+        diagnostics_button.clicked.connect(self.open_diagnostics_dialog)
+        layout.addWidget(diagnostics_button, 8, 4)
+
+        # The chart is created after the window is shown; until then a
+        # placeholder holds its place
+        self.graph_widget = None
+        self.pending_graph = None
+        self.graph_placeholder = QLabel("Loading chart...")
+        self.graph_placeholder.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
         # Create a container for the graph widget
         graph_container = QWidget(self)
@@ -354,16 +777,23 @@ class MainWindow(QMainWindow):
         """)
 
         # Set layout for the container and add the graph widget to it
-        container_layout = QVBoxLayout(graph_container)
-        container_layout.addWidget(self.graph_widget)
+        self.container_layout = QVBoxLayout(graph_container)
+        container_layout = self.container_layout
+        container_layout.addWidget(self.graph_placeholder)
         container_layout.setContentsMargins(0, 0, 0, 0)  # No extra margin inside the container
         container_layout.setSpacing(0)
 
         # Add the container to the main layout
         layout.addWidget(graph_container, 1, 3, 6, 2)
 
-        # Default graph (Monthly Balance)
-        self.graph_widget.plot_balance(self.db)
+        # Shown while background queries are running
+        self.loading_label = QLabel("Loading...")
+        self.loading_label.hide()
+        layout.addWidget(self.loading_label, 7, 3)
+
+        # Default graph (Monthly Balance). The query starts now and runs while
+        # the window is shown and matplotlib loads.
+        self.switch_graph('balance')
 
         # Add the "Switch Graphs" button
         graphs_button = QPushButton("Switch Graphs")
@@ -376,46 +806,249 @@ class MainWindow(QMainWindow):
         # Update the running balance on startup
         self.update_running_balance()
 
+        self.chart_shown = False
+        startup_timer.mark('window_built')
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.graph_widget is None:
+            # Let the first frame reach the screen before loading matplotlib
+            QTimer.singleShot(0, self.create_graph_widget)
+
+    def create_graph_widget(self):
+        if self.graph_widget is not None:
+            return
+        startup_timer.mark('first_paint')
+        import charts
+        startup_timer.mark('matplotlib_import')
+
+        self.graph_widget = charts.GraphWidget(self, width=5, height=4)
+        self.container_layout.replaceWidget(self.graph_placeholder, self.graph_widget)
+        self.graph_placeholder.deleteLater()
+        if self.pending_graph is not None:
+            self.render_graph(*self.pending_graph)
+
+    def render_graph(self, graph_type, data):
+        """Draw loaded graph data, or keep it until the chart widget exists."""
+        if self.graph_widget is None:
+            self.pending_graph = (graph_type, data)
+            return
+        self.pending_graph = None
+        self.graph_widget.render(graph_type, data)
+        if not self.chart_shown:
+            self.chart_shown = True
+            startup_timer.mark('first_chart')
+            startup_timer.report()
+
     def update_running_balance(self):
-        """Fetch the current running balance and update the label."""
-        running_balance = main.get_running_balance(self.db)
-        self.running_balance_label.setText(f"Running Balance: ${running_balance:.2f}")
+        """Fetch the current running balance in the background and update the label."""
+        if self.account is None:
+            paths = list(self.accounts.values())
+            self.queries.submit('balance', lambda _db: accounts.get_running_balance(paths),
+                                on_result=self.show_running_balance)
+        else:
+            self.queries.submit('balance', journal.read_balance, self.writer, on_result=self.show_committed_balance)
+
+    def show_committed_balance(self, balance):
+        self.committed_balance = balance
+        self.show_optimistic_balance()
+
+    def show_optimistic_balance(self):
+        # The last balance read plus any queued writes it doesn't include yet
+        if self.committed_balance is None:
+            return
+        cents, applied = self.committed_balance
+        self.show_running_balance(cents + self.write_queue().pending_net(applied))
+
+    def show_running_balance(self, running_balance):
+        self.running_balance_label.setText(f"Running Balance: ${database.format_cents(running_balance)}")
+
+    def replay_journals(self):
+        """Commit writes that earlier runs journaled but didn't get to commit."""
+        for path in self.accounts.values():
+            if not journal.journal_paths(path):
+                continue
+            db = self.db if path == self.db.db_name else database.Database(path)
+            database.migrate(db)
+            journal.replay_journals(db)
+            if db is not self.db:
+                db.close()
+
+    def write_queue(self):
+        """The write-behind queue of the current account's database."""
+        # The same file can be reached through a relative and an absolute path
+        key = os.path.abspath(self.db.db_name)
+        if key not in self.write_queues:
+            queue = workers.WriteBehindQueue(self.queries, self.db.db_name, self.writer, parent=self)
+            queue.queued.connect(self.show_optimistic_balance)
+            queue.flushed.connect(self.refresh_after_write)
+            queue.failed.connect(self.show_write_error)
+            self.write_queues[key] = queue
+        return self.write_queues[key]
+
+    def set_loading(self, loading):
+        self.loading_label.setVisible(loading)
+
+    def refresh_after_write(self, _result=None):
+        self.switch_graph('balance')  # Refresh graph
+        self.update_running_balance()  # Refresh balance label
+
+    def show_write_error(self, message):
+        QMessageBox.warning(self, "Save Failed", message)
+
+    def fill_account_input(self):
+        self.account_input.clear()
+        for name in self.accounts:
+            self.account_input.addItem(name, name)
+        self.account_input.addItem("All Accounts", None)
+        self.account_input.setCurrentIndex(self.account_input.findData(self.account))
+
+    def switch_account(self, index):
+        """Show one account, or the combined view of all of them."""
+        account = self.account_input.itemData(index)
+        if account == self.account and index != -1:
+            return
+        self.account = account
+        self.committed_balance = None
+        if account is not None:
+            self.db.close()
+            self.db = database.Database(self.accounts[account])
+            database.migrate(self.db)
+            # Queued writes keep the account they were submitted for
+            self.queries.db_name = self.db.db_name
+
+        # Writes and browsing need a single account
+        for button in (self.add_income_button, self.add_expenses_button, self.import_button, self.browse_button):
+            button.setEnabled(account is not None)
+        self.setWindowTitle(f"Finance Planner - {account or 'All Accounts'}")
+        self.refresh_after_write()
+
+    def open_new_account_dialog(self):
+        name, ok = QInputDialog.getText(self, "New Account", "Account name:")
+        if not ok or not name.strip():
+            return
+        try:
+            accounts.add_account(name)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "New Account", str(e))
+            return
+        self.accounts = accounts.load_accounts()
+        self.fill_account_input()
+        self.account_input.setCurrentIndex(self.account_input.findData(name.strip()))
+        self.switch_account(self.account_input.currentIndex())
 
     def open_add_income_dialog(self):
-        dialog = AddIncomeDialog(self.db, self)
+        dialog = AddIncomeDialog(self)
         if dialog.exec_() == QDialog.Accepted:
-            self.graph_widget.plot_balance(self.db)  # Refresh graph
-            self.update_running_balance()  # Refresh balance label
+            try:
+                self.write_queue().add_income(*dialog.get_values())
+            except (OSError, ValueError) as e:
+                self.show_write_error(str(e))
 
     def open_add_expense_dialog(self):
-        dialog = AddExpenseDialog(self.db, self)
+        dialog = AddExpenseDialog(self)
         if dialog.exec_() == QDialog.Accepted:
-            self.graph_widget.plot_balance(self.db)  # Refresh graph
-            self.update_running_balance()  # Refresh balance label
+            try:
+                self.write_queue().add_spend(*dialog.get_values())
+            except (OSError, ValueError) as e:
+                self.show_write_error(str(e))
+
+    def open_browser_dialog(self):
+        dialog = TransactionBrowserDialog(self.db, self)
+        dialog.exec_()
+
+    def open_diagnostics_dialog(self):
+        DiagnosticsDialog(self).exec_()
+
+    def open_import_dialog(self):
+        """Bulk import bank statements with a progress dialog."""
+        paths, _ = QFileDialog.getOpenFileNames(
+            self, "Import Statements", "", "Statements (*.csv *.qif *.ofx *.qfx);;All Files (*)"
+        )
+        if not paths:
+            return
+
+        progress_dialog = QProgressDialog("Importing statements...", "Cancel", 0, 0, self)
+        progress_dialog.setWindowTitle("Import Statements")
+        progress_dialog.setWindowModality(Qt.WindowModal)
+        progress_dialog.setMinimumDuration(0)
+
+        # Runs on the pool with its own connection; the window stays live
+        # but writes, imports and account switches wait until it finishes
+        job = self.import_job = workers.ImportProgress(self)
+        job.progressed.connect(lambda count: progress_dialog.setLabelText(f"Imported {count} transactions..."))
+        progress_dialog.canceled.connect(job.cancel)
+        self.set_importing(True)
+
+        def finish(count=None, error=None):
+            self.import_job = None
+            progress_dialog.close()
+            self.set_importing(False)
+            if error is not None:
+                QMessageBox.warning(self, "Import Failed", error)
+            else:
+                QMessageBox.information(self, "Import Complete", f"Imported {count} transactions.")
+            self.refresh_after_write()
+
+        self.queries.submit(
+            None, lambda db: importer.import_files(db, paths, progress=job.report),
+            on_result=lambda count: finish(count), on_error=lambda message: finish(error=message),
+        )
+        progress_dialog.show()
+
+    def set_importing(self, importing):
+        for widget in (self.add_income_button, self.add_expenses_button, self.import_button, self.account_input,
+                       self.new_account_button):
+            widget.setEnabled(not importing)
 
     def open_debt_calculator_dialog(self):
         """Open the Debt Calculator Dialog."""
-        dialog = DebtCalculatorDialog(self)
+        dialog = DebtCalculatorDialog(self, self.queries)
         dialog.exec_()
 
     def open_graph_selection_dialog(self):
-        dialog = GraphSelectionDialog(self)
+        # The month list is read in the background and the dialog opens when
+        # it arrives; clicking again before then opens just one dialog
+        if self.account is None:
+            paths = list(self.accounts.values())
+            self.queries.submit('months', lambda _db: accounts.get_spending_months(paths),
+                                on_result=self.show_graph_selection_dialog)
+        else:
+            self.queries.submit('months', database.get_spending_months, on_result=self.show_graph_selection_dialog)
+
+    def show_graph_selection_dialog(self, months):
+        dialog = GraphSelectionDialog(self, months)
         if dialog.exec_() == QDialog.Accepted:
             selected_graph = dialog.get_selected_graph()
-            self.switch_graph(selected_graph)
+            self.switch_graph(selected_graph, *dialog.get_graph_args())
+
+    def switch_graph(self, graph_type, *args):
+        # Load the selected graph's data in the background; if the user
+        # switches again before it arrives, the older result is dropped
+        if self.account is None:
+            paths = list(self.accounts.values())
+            loader = chart_data.COMBINED_GRAPH_LOADERS[graph_type]
+            self.queries.submit('graph', lambda _db: loader(paths, *args),
+                                on_result=lambda data: self.render_graph(graph_type, data))
+        else:
+            self.queries.submit(
+                'graph', chart_data.GRAPH_LOADERS[graph_type], *args,
+                on_result=lambda data: self.render_graph(graph_type, data),
+            )
 
-    def switch_graph(self, graph_type):
-        # Switch between the graphs based on the selected type
-        if graph_type == 'balance':
-            self.graph_widget.plot_balance(self.db)
-        elif graph_type == 'expenses':
-            self.graph_widget.plot_expenses(self.db)
-        elif graph_type == 'income':
-            self.graph_widget.plot_income(self.db)
+    def closeEvent(self, event):
+        if self.import_job is not None:
+            # Stop after the chunk in progress; committed chunks are kept
+            self.import_job.cancel()
+        for queue in self.write_queues.values():
+            queue.close()
+        self.queries.wait()
+        super().closeEvent(event)
 
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
+    startup_timer.mark('window_shown')
     sys.exit(app.exec())
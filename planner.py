@@ -0,0 +1,177 @@
+import math
+from collections import namedtuple
+
+import interest
+
+# One debt to pay down. rate is the annual rate as a decimal and minimum the
+# required monthly payment, both like interest.loan_summary.
+Loan = namedtuple('Loan', ['name', 'balance', 'rate', 'minimum'])
+
+# Outcome of plan(); payoff_months maps each loan name to the month it was
+# cleared.
+PlanResult = namedtuple('PlanResult', ['strategy', 'order', 'months', 'total_paid', 'total_interest', 'payoff_months'])
+
+# One loan's line in one month of plan_schedule()
+PlanRow = namedtuple('PlanRow', ['month', 'loan', 'payment', 'interest', 'principal', 'balance'])
+
+# Priority keys: the first loan in sort order gets every dollar left over
+# after the minimums
+STRATEGIES = {
+    'avalanche': lambda loan: (-loan.rate, loan.balance),
+    'snowball': lambda loan: (loan.balance, -loan.rate),
+}
+
+# Balances below half a cent count as paid, as in interest.loan_summary
+PAID = 0.005
+
+DEFAULT_MAX_MONTHS = 1200
+
+
+def priority_order(loans, strategy):
+    """Loans in the order extra payments go to them.
+
+    strategy is 'avalanche' (highest rate first), 'snowball' (smallest
+    balance first), a key function, or a custom sequence of loan names.
+    """
+    if callable(strategy):
+        return sorted(loans, key=strategy)
+    if isinstance(strategy, str):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy: {strategy!r}")
+        return sorted(loans, key=STRATEGIES[strategy])
+
+    by_name = {loan.name: loan for loan in loans}
+    missing = set(by_name) - set(strategy)
+    unknown = [name for name in strategy if name not in by_name]
+    if missing or unknown:
+        raise ValueError(f"Custom order must list every loan exactly once (missing {sorted(missing)}, "
+                         f"unknown {unknown})")
+    return [by_name[name] for name in strategy]
+
+
+def _check(loans, budget):
+    if len({loan.name for loan in loans}) != len(loans):
+        raise ValueError("Loan names must be unique.")
+    if any(loan.balance < 0 or loan.rate < 0 or loan.minimum <= 0 for loan in loans):
+        raise ValueError("Balances and rates can't be negative and minimums must be positive.")
+    if budget < sum(loan.minimum for loan in loans):
+        raise ValueError("Monthly budget doesn't cover the minimum payments.")
+
+
+def _pay_month(order, balances, budget):
+    """Apply one month of interest and payments in place.
+
+    Every loan still owing gets its minimum (or whatever it still owes),
+    then what is left of the budget goes to the loans in priority order.
+    Returns each loan's (payment, interest) for the month.
+    """
+    paid = {}
+    for loan in order:
+        if balances[loan.name] > 0:
+            charge = balances[loan.name] * loan.rate / 12
+            balances[loan.name] += charge
+            paid[loan.name] = [min(loan.minimum, balances[loan.name]), charge]
+    left = budget - sum(payment for payment, _ in paid.values())
+    for loan in order:
+        if loan.name in paid and left > 0:
+            extra = min(left, balances[loan.name] - paid[loan.name][0])
+            paid[loan.name][0] += extra
+            left -= extra
+    for name, (payment, _) in paid.items():
+        balances[name] -= payment
+        if balances[name] < PAID:
+            balances[name] = 0
+    return paid
+
+
+def _months_to_clear(balance, rate, payment):
+    try:
+        return interest.loan_summary(balance, rate, payment).months
+    except ValueError:
+        return math.inf
+
+
+def _balance_after(balance, rate, payment, months):
+    if rate == 0:
+        return balance - payment * months
+    return interest._balance_after(balance, rate / 12, payment, months)
+
+
+def plan(loans, budget, strategy='avalanche', max_months=DEFAULT_MAX_MONTHS):
+    """Pay off several loans from one monthly budget and total up the cost.
+
+    Each month every loan gets its minimum and the rest of the budget goes
+    to the highest-priority loan still owing; a cleared loan's payment rolls
+    over to the next one. Between payoffs every loan's payment is constant,
+    so instead of stepping month by month the plan jumps straight to the
+    next payoff with the annuity formulas and only steps the payoff month
+    itself. The cost grows with the number of loans, not the number of
+    months. Raises ValueError if the loans aren't cleared within max_months.
+    """
+    loans = [Loan(*loan) for loan in loans]
+    _check(loans, budget)
+    order = priority_order(loans, strategy)
+    balances = {loan.name: float(loan.balance) for loan in loans}
+    payoff_months = {loan.name: 0 for loan in loans if loan.balance < PAID}
+    for name in payoff_months:
+        balances[name] = 0
+    month = 0
+    total_paid = 0.0
+
+    while len(payoff_months) < len(loans):
+        # Constant payments until the next payoff: minimums, plus the extra
+        # for the first loan still owing
+        owing = [loan for loan in order if balances[loan.name] > 0]
+        extra = budget - sum(loan.minimum for loan in owing)
+        payments = {loan.name: loan.minimum for loan in owing}
+        payments[owing[0].name] += extra
+
+        jump = min(_months_to_clear(balances[loan.name], loan.rate, payments[loan.name]) for loan in owing) - 1
+        if month + jump + 1 > max_months:
+            raise ValueError(f"Loans are not paid off within {max_months} months.")
+        if jump > 0:
+            for loan in owing:
+                balances[loan.name] = _balance_after(balances[loan.name], loan.rate, payments[loan.name], jump)
+            total_paid += budget * jump
+            month += jump
+
+        # The payoff month itself, where freed-up money moves down the order
+        month += 1
+        for name, (payment, _) in _pay_month(order, balances, budget).items():
+            total_paid += payment
+            if balances[name] == 0:
+                payoff_months[name] = month
+
+    principal = sum(loan.balance for loan in loans)
+    return PlanResult(strategy if isinstance(strategy, str) else 'custom', [loan.name for loan in order],
+                      month, total_paid, total_paid - principal, payoff_months)
+
+
+def compare_strategies(loans, budget, strategies=('avalanche', 'snowball'), max_months=DEFAULT_MAX_MONTHS):
+    """plan() for each strategy, cheapest first."""
+    results = [plan(loans, budget, strategy, max_months) for strategy in strategies]
+    return sorted(results, key=lambda result: result.total_interest)
+
+
+def plan_schedule(loans, budget, strategy='avalanche', max_months=DEFAULT_MAX_MONTHS):
+    """Return an iterator of PlanRow, one per loan still owing per month.
+
+    This steps month by month, so only use it when the per-loan schedule is
+    actually needed; plan() gives the totals much faster. The inputs are
+    checked right away, before the first row is requested.
+    """
+    loans = [Loan(*loan) for loan in loans]
+    _check(loans, budget)
+    order = priority_order(loans, strategy)
+    balances = {loan.name: float(loan.balance) if loan.balance >= PAID else 0 for loan in loans}
+    return _schedule(order, balances, budget, max_months)
+
+
+def _schedule(order, balances, budget, max_months):
+    month = 0
+    while any(balances.values()):
+        month += 1
+        if month > max_months:
+            raise ValueError(f"Loans are not paid off within {max_months} months.")
+        for name, (payment, charge) in _pay_month(order, balances, budget).items():
+            yield PlanRow(month, name, payment, charge, payment - charge, balances[name])
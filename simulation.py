@@ -0,0 +1,128 @@
+import multiprocessing
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import database
+
+# Per-path outcomes of simulate(). Months are when the loan was paid off or
+# the savings reached the price; paths that never got there within
+# max_months hold inf, as does their loan interest.
+SimulationResult = namedtuple('SimulationResult', ['loan_months', 'loan_interest', 'save_months'])
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def monthly_net_history(db):
+    """Each recorded month's income minus spending, in dollars."""
+    return np.array([database.cents_to_dollars(balance) for _, balance in database.get_monthly_balance(db)],
+                    dtype=float)
+
+
+def _simulate_chunk(job):
+    """Run one block of paths month by month, vectorized across the paths.
+
+    Each month the amount available for the goal is the planned payment,
+    capped by that month's net cash flow drawn from the history, so a short
+    month puts less toward either goal and a losing month puts nothing. The
+    loan rate takes a random walk when rate_volatility is set.
+    """
+    principal, annual_rate, payment, net_samples, paths, seed, rate_volatility, savings_rate, max_months = job
+    rng = np.random.default_rng(seed)
+
+    loan = np.full(paths, float(principal))
+    interest_paid = np.zeros(paths)
+    savings = np.zeros(paths)
+    rates = np.full(paths, annual_rate / 12)
+    loan_months = np.full(paths, np.inf)
+    save_months = np.full(paths, np.inf)
+    # rate_volatility is the yearly standard deviation of the annual rate
+    rate_step = rate_volatility / 12 / np.sqrt(12)
+    savings_growth = 1 + savings_rate / 12
+
+    for month in range(1, max_months + 1):
+        if net_samples is None or not len(net_samples):
+            contribution = np.full(paths, float(payment))
+        else:
+            contribution = np.clip(rng.choice(net_samples, paths), 0, payment)
+        if rate_step:
+            rates = np.maximum(rates + rng.normal(0, rate_step, paths), 0)
+
+        owing = loan > 0
+        charge = loan * rates
+        interest_paid += charge
+        loan = loan + charge - contribution
+        loan_months[owing & (loan <= 0)] = month
+        loan = np.maximum(loan, 0)
+
+        saving = np.isinf(save_months)
+        savings = savings * savings_growth + contribution
+        save_months[saving & (savings >= principal)] = month
+
+        if not owing.any() and not saving.any():
+            break
+
+    interest_paid[np.isinf(loan_months)] = np.inf
+    return loan_months, interest_paid, save_months
+
+
+def simulate(principal, annual_rate, payment, net_samples=None, paths=100000, seed=None,
+             rate_volatility=0.0, savings_rate=0.0, max_months=600, workers=None, chunk_size=25000):
+    """Monte Carlo comparison of taking a loan now versus saving up first.
+
+    net_samples are historical monthly net cash flows in dollars to bootstrap
+    from; without them every month pays exactly `payment`. The paths are
+    split into chunks that run on a process pool of `workers` processes
+    (default: one per CPU). Every chunk gets its own seed from `seed`, so the
+    result doesn't depend on the number of workers.
+    """
+    if principal <= 0 or payment <= 0 or annual_rate < 0:
+        raise ValueError("Loan amount and payment must be positive and the rate not negative.")
+    if net_samples is not None:
+        net_samples = np.asarray(net_samples, dtype=float)
+
+    sizes = [min(chunk_size, paths - start) for start in range(0, paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(principal, annual_rate, payment, net_samples, size, chunk_seed, rate_volatility, savings_rate, max_months)
+            for size, chunk_seed in zip(sizes, seeds)]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) == 1:
+        chunks = list(map(_simulate_chunk, jobs))
+    else:
+        # spawn rather than fork: the GUI calls this from a worker thread and
+        # forking a threaded Qt process isn't safe
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=context) as pool:
+            chunks = list(pool.map(_simulate_chunk, jobs))
+
+    return SimulationResult(*(np.concatenate(column) for column in zip(*chunks)))
+
+
+def summarize(result, percentiles=PERCENTILES):
+    """Percentiles of each outcome plus the share of paths that finished.
+
+    Unfinished paths count as slower and costlier than any finished one, so
+    a percentile past the finished share comes out as inf.
+    """
+    summary = {'paths': len(result.loan_months)}
+    for name in SimulationResult._fields:
+        values = getattr(result, name)
+        summary[name] = dict(zip(percentiles, np.percentile(values, percentiles, method='inverted_cdf').tolist()))
+    summary['loan_repaid'] = float(np.isfinite(result.loan_months).mean())
+    summary['save_reached'] = float(np.isfinite(result.save_months).mean())
+    return summary
+
+
+def simulate_from_history(db, principal, annual_rate, payment, rate_volatility=0.0, **options):
+    """simulate() bootstrapped from the database's monthly history, summarized.
+
+    Takes the db first so it can run through workers.QueryRunner.
+    """
+    history = monthly_net_history(db)
+    summary = summarize(simulate(principal, annual_rate, payment, history if len(history) else None,
+                                 rate_volatility=rate_volatility, **options))
+    summary['history_months'] = len(history)
+    return summary
@@ -0,0 +1,36 @@
+from datetime import date
+
+import database
+import forecast
+
+
+def ledger(with_future_row):
+    db = database.Database(':memory:')
+    database.migrate(db)
+    this_month = date.today().strftime('%Y-%m')
+    month = forecast.next_month(this_month, -24)
+    while month <= this_month:
+        database.add_income(db, f"{month}-01", 3000)
+        database.add_spend(db, f"{month}-02", 'Rent', 1200)
+        month = forecast.next_month(month)
+    if with_future_row:
+        database.add_spend(db, f"{forecast.next_month(this_month, 36)}-01", 'Rent', 1200)
+    return db
+
+
+def test_future_dated_row_does_not_move_the_forecast():
+    expected = forecast.forecast(ledger(False), 6)
+    result = forecast.forecast(ledger(True), 6)
+    assert result.months == expected.months
+    assert result.months[0] == forecast.next_month(date.today().strftime('%Y-%m'))
+    assert result.net == expected.net
+    assert result.net_sd == expected.net_sd
+
+
+def test_months_emptied_by_deletes_are_not_the_latest():
+    db = ledger(False)
+    this_month = date.today().strftime('%Y-%m')
+    db.update_data("DELETE FROM INCOME WHERE Date = ?", (this_month,))
+    db.update_data("DELETE FROM SPEND WHERE Date = ?", (this_month,))
+    database.mark_changed(db, 'INCOME', 'SPEND')
+    assert forecast.forecast(db, 6).months[0] == this_month
@@ -0,0 +1,12 @@
+import pytest
+
+import importer
+
+
+def test_truncated_csv_row_names_its_line(tmp_path):
+    path = tmp_path / 'statement.csv'
+    path.write_text("Date,Description,Amount\n2024-01-05,Pay,1500.00\n2024-01-06,Groceries\n")
+    transactions = importer.read_csv(str(path))
+    assert next(transactions).amount == 150000
+    with pytest.raises(ValueError, match='line 3'):
+        next(transactions)
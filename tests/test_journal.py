@@ -0,0 +1,101 @@
+import pytest
+
+import database
+import journal
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'ledger.db')
+    db = database.Database(path)
+    database.migrate(db)
+    db.close()
+    return path
+
+
+def income_total(path):
+    db = database.Database(path)
+    try:
+        return db.get_total_income()
+    finally:
+        db.close()
+
+
+def test_two_writers_on_one_file_lose_nothing(db_path):
+    writers = [journal.new_writer_id(), journal.new_writer_id()]
+    journals = [journal.Journal(journal.journal_path(db_path, writer)) for writer in writers]
+    batches = [[], []]
+    for seq in range(1, 4):
+        for i, writer in enumerate(writers):
+            entry = journal.make_entry(writer, seq, 'income', '2024-01-15', 10 * (i + 1))
+            journals[i].append(entry)
+            batches[i].append(entry)
+
+    # The second writer commits first; the first writer's lower seqs still apply
+    db = database.Database(db_path)
+    assert journal.apply_entries(db, batches[1]) == 3
+    journals[1].rewrite([])
+    assert journal.apply_entries(db, batches[0]) == 3
+    assert journal.read_balance(db, writers[0]) == (9000, 3)
+    assert journal.read_balance(db, writers[1]) == (9000, 3)
+
+    # Applying a batch again is a no-op
+    assert journal.apply_entries(db, batches[0]) == 0
+    db.close()
+    assert income_total(db_path) == 9000
+    for j in journals:
+        j.close()
+
+
+def test_replay_skips_live_writers(db_path):
+    live, gone = journal.new_writer_id(), journal.new_writer_id()
+    live_journal = journal.Journal(journal.journal_path(db_path, live))
+    live_journal.append(journal.make_entry(live, 1, 'income', '2024-01-15', 5))
+    gone_journal = journal.Journal(journal.journal_path(db_path, gone))
+    gone_journal.append(journal.make_entry(gone, 1, 'spend', '2024-01-16', 2, 'Food'))
+    gone_journal.close()
+
+    db = database.Database(db_path)
+    assert journal.replay_journals(db) == 1
+    assert journal.journal_paths(db_path) == [journal.journal_path(db_path, live)]
+    assert journal.read_journal(journal.journal_path(db_path, live))[0]['writer'] == live
+    live_journal.close()
+    assert journal.replay_journals(db) == 1
+    assert journal.journal_paths(db_path) == []
+    assert journal.read_balance(db, live)[0] == 300
+    db.close()
+
+
+def test_legacy_journal_entries_replay_once(db_path):
+    path = journal.journal_path(db_path)
+    legacy = journal.make_entry(journal.LEGACY_WRITER, 1, 'income', '2024-02-01', 7)
+    del legacy['writer']
+    j = journal.Journal(path)
+    j.append(legacy)
+    j.close()
+
+    db = database.Database(db_path)
+    assert journal.replay_journals(db) == 1
+    assert journal.apply_entries(db, [legacy]) == 0
+    db.close()
+    assert income_total(db_path) == 700
+
+
+def test_queues_on_one_file_lose_nothing(db_path):
+    QtCore = pytest.importorskip('PyQt5.QtCore')
+    import workers
+
+    app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+    runner = workers.QueryRunner(db_path)
+    queues = [workers.WriteBehindQueue(runner, db_path, journal.new_writer_id()) for _ in range(2)]
+    for queue in queues:
+        queue.add_income('2024-03-01', 1)
+        queue.add_income('2024-03-02', 2)
+    for queue in queues:
+        queue.flush()
+        runner.wait()
+        app.processEvents()
+    for queue in queues:
+        assert queue.pending == []
+        queue.close()
+    assert income_total(db_path) == 600
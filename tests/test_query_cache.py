@@ -0,0 +1,29 @@
+import database
+
+
+def test_new_connection_keeps_the_cache(tmp_path):
+    path = str(tmp_path / 'ledger.db')
+    first = database.Database(path)
+    database.migrate(first)
+    database.get_running_balance(first)
+    hits = database.query_cache.hits
+
+    second = database.Database(path)
+    database.get_running_balance(second)
+    assert database.query_cache.hits == hits + 1
+    first.close()
+    second.close()
+
+
+def test_write_from_another_connection_invalidates(tmp_path):
+    path = str(tmp_path / 'ledger.db')
+    reader = database.Database(path)
+    database.migrate(reader)
+    assert database.get_running_balance(reader) == 0
+
+    # Written without mark_changed, as another process would
+    writer = database.Database(path)
+    writer.update_data(database.INSERT_INCOME_SQL, ('2024-01', 20240105, 2500))
+    writer.close()
+    assert database.get_running_balance(reader) == 2500
+    reader.close()
@@ -0,0 +1,213 @@
+import itertools
+import threading
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+import database
+import journal
+
+class QueryWorker(QRunnable):
+    """Runs func(db, *args) on a pool thread and reports back through runner.
+
+    db is the pool thread's own connection from database.thread_database.
+    """
+
+    def __init__(self, runner, request_id, db_name, func, args):
+        super().__init__()
+        self.runner = runner
+        self.request_id = request_id
+        self.db_name = db_name
+        self.func = func
+        self.args = args
+
+    def run(self):
+        try:
+            result = self.func(database.thread_database(self.db_name), *self.args)
+        except Exception as e:
+            self.runner.failed.emit(self.request_id, str(e))
+        else:
+            self.runner.finished.emit(self.request_id, result)
+
+
+class QueryRunner(QObject):
+    """Runs database work in the background and hands results to the GUI thread.
+
+    Each submission belongs to a channel such as 'graph' or 'balance'. Only
+    the newest request on a channel delivers its result; anything older that
+    finishes later is dropped, so quickly switching graphs never paints a
+    stale chart. Submissions with channel=None are always delivered, which is
+    what writes should use.
+    """
+
+    # Emitted from pool threads; queued onto the GUI thread because the
+    # runner lives there
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+    # Emitted on the GUI thread whenever a channel goes from idle to busy or back
+    busy_changed = pyqtSignal(bool)
+
+    def __init__(self, db_name, parent=None):
+        super().__init__(parent)
+        self.db_name = db_name
+        self.pool = QThreadPool(self)
+        self._ids = itertools.count(1)
+        self._latest = {}  # channel -> newest request id
+        self._pending = {}  # request id -> (channel, on_result, on_error)
+        self.finished.connect(self._on_finished)
+        self.failed.connect(self._on_failed)
+
+    def submit(self, channel, func, *args, on_result=None, on_error=None):
+        request_id = next(self._ids)
+        was_busy = self.is_busy()
+        if channel is not None:
+            self._latest[channel] = request_id
+        self._pending[request_id] = (channel, on_result, on_error)
+        self.pool.start(QueryWorker(self, request_id, self.db_name, func, args))
+        if not was_busy:
+            self.busy_changed.emit(True)
+        return request_id
+
+    def is_busy(self):
+        return bool(self._pending)
+
+    def wait(self, msecs=-1):
+        return self.pool.waitForDone(msecs)
+
+    def _take(self, request_id):
+        channel, on_result, on_error = self._pending.pop(request_id)
+        current = channel is None or self._latest.get(channel) == request_id
+        if not self._pending:
+            self.busy_changed.emit(False)
+        return current, on_result, on_error
+
+    def _on_finished(self, request_id, result):
+        current, on_result, _ = self._take(request_id)
+        if current and on_result is not None:
+            on_result(result)
+
+    def _on_failed(self, request_id, message):
+        current, _, on_error = self._take(request_id)
+        if current and on_error is not None:
+            on_error(message)
+
+
+class ImportProgress(QObject):
+    """Carries a background import's progress to the GUI thread.
+
+    Pass report as the importer's progress callback. It runs on the pool
+    thread, emits progressed with the rows imported so far and stops the
+    import after the current chunk once cancel() has been called.
+    """
+
+    progressed = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def report(self, count):
+        self.progressed.emit(count)
+        return not self._cancelled.is_set()
+
+
+def _apply_batch(_db, db_name, entries):
+    # Always the queue's own database, whatever account the runner is on now
+    return journal.apply_entries(database.thread_database(db_name), entries)
+
+
+class WriteBehindQueue(QObject):
+    """Accepts income and spending writes at once and commits them in batches.
+
+    Each write is validated, appended to the journal and held in memory,
+    then the GUI is told straight away (queued) so it can show the change.
+    Writes arriving within flush_ms of each other, or up to flush_rows of
+    them, go to the database as one transaction on the runner's pool, and
+    flushed fires once per batch so aggregates are re-read once per batch
+    rather than once per write. One batch is in flight at a time, so
+    batches commit in order. Writes are numbered from 1 under writer, an
+    id no other queue uses, so queues in other windows or processes on the
+    same database never collide. Anything still in the journal after a
+    crash is committed by journal.replay_journals on the next start.
+    """
+
+    # Emitted on the GUI thread
+    queued = pyqtSignal()
+    flushed = pyqtSignal(int)
+    failed = pyqtSignal(str)
+
+    def __init__(self, runner, db_name, writer, flush_ms=journal.FLUSH_MS, flush_rows=journal.FLUSH_ROWS,
+                 parent=None):
+        super().__init__(parent)
+        self.runner = runner
+        self.db_name = db_name
+        self.writer = writer
+        self.flush_ms = flush_ms
+        self.flush_rows = flush_rows
+        self.journal = journal.Journal(journal.journal_path(db_name, writer))
+        self.pending = []
+        self._seq = 0
+        self._in_flight = 0
+        self._failing = False
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+
+    def add_income(self, date, amount):
+        self._add('income', date, amount)
+
+    def add_spend(self, date, spend_type, amount):
+        self._add('spend', date, amount, spend_type)
+
+    def _add(self, kind, date, amount, spend_type=None):
+        entry = journal.make_entry(self.writer, self._seq + 1, kind, date, amount, spend_type)
+        self.journal.append(entry)
+        self._seq += 1
+        self.pending.append(entry)
+        self.queued.emit()
+        if len(self.pending) - self._in_flight >= self.flush_rows:
+            self.flush()
+        elif not self._timer.isActive():
+            # Measured from the first write of a burst, so a steady stream
+            # still commits every flush_ms
+            self._timer.start(self.flush_ms)
+
+    def pending_net(self, applied_seq=0):
+        """Balance change of the queued writes a read at applied_seq doesn't include."""
+        return sum(journal.net_amount(entry) for entry in self.pending if entry['seq'] > applied_seq)
+
+    def flush(self):
+        """Start committing everything queued, unless a batch is already in flight."""
+        self._timer.stop()
+        if self._in_flight or not self.pending:
+            return
+        batch = list(self.pending)
+        self._in_flight = len(batch)
+        self.runner.submit(None, _apply_batch, self.db_name, batch,
+                           on_result=self._on_flushed, on_error=self._on_failed)
+
+    def _on_flushed(self, _count):
+        committed, self._in_flight = self._in_flight, 0
+        self._failing = False
+        del self.pending[:committed]
+        self.journal.rewrite(self.pending)
+        self.flushed.emit(committed)
+        if self.pending:
+            self._timer.start(self.flush_ms)
+
+    def _on_failed(self, message):
+        # Everything stays queued and journaled; retry later, reporting only
+        # the first failure in a row
+        self._in_flight = 0
+        if not self._failing:
+            self._failing = True
+            self.failed.emit(message)
+        self._timer.start(journal.RETRY_MS)
+
+    def close(self):
+        """Submit what is queued; the journal covers it if it doesn't finish."""
+        self.flush()
+        self.journal.close()